@@ -0,0 +1,86 @@
+"""
+Batch answering CLI for nightly advisories.
+
+Reads questions from a JSONL file (one object per line with "query" or "question",
+and optional "id", "lat", "lon", "mode", "filters") and writes one JSON answer per line, in
+completion order, as soon as each answer is ready. Failed items carry an "error";
+lines that are not valid JSON or have no question are reported the same way (with
+their line number as "id") and the rest of the file is still answered.
+
+Usage:
+    python answer_batch.py questions.jsonl answers.jsonl [--concurrency 8] [--mode concise]
+    (use "-" for stdin / stdout)
+"""
+import sys
+import json
+import time
+import argparse
+
+from config.config import DEFAULT_LAT, DEFAULT_LON
+from config.constants import BATCH_LLM_CONCURRENCY
+from services.genai_service import answer_many
+
+
+def _read_questions(stream):
+    """
+    Yields (item, None) for every question and (None, error_record) for lines that
+    cannot be answered, so one bad line does not stop the batch.
+    """
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield None, {"id": line_no, "error": f"Invalid JSON on line {line_no}: {e}"}
+            continue
+        if isinstance(item, str):
+            item = {"query": item}
+        if not isinstance(item, dict) or not str(item.get("query") or item.get("question") or "").strip():
+            yield None, {"id": line_no, "error": f"No \"query\" or \"question\" on line {line_no}"}
+            continue
+        item.setdefault("id", line_no)
+        yield item, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions in bulk.")
+    parser.add_argument("input", help="questions .jsonl file, or - for stdin")
+    parser.add_argument("output", help="answers .jsonl file, or - for stdout")
+    parser.add_argument("--concurrency", type=int, default=BATCH_LLM_CONCURRENCY)
+    parser.add_argument("--mode", default="concise", choices=["concise", "detailed"])
+    parser.add_argument("--lat", type=float, default=DEFAULT_LAT)
+    parser.add_argument("--lon", type=float, default=DEFAULT_LON)
+    args = parser.parse_args()
+
+    src = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start, done, failed = time.time(), 0, 0
+    try:
+        questions = []
+        for item, error in _read_questions(src):
+            if error is None:
+                questions.append(item)
+                continue
+            dst.write(json.dumps(error, ensure_ascii=False) + "\n")
+            done += 1
+            failed += 1
+        dst.flush()
+        for result in answer_many(questions, lat=args.lat, lon=args.lon, mode=args.mode,
+                                  concurrency=args.concurrency):
+            dst.write(json.dumps(result, ensure_ascii=False) + "\n")
+            dst.flush()
+            done += 1
+            failed += "error" in result
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+    print(f"✅ {done} answers written ({failed} failed) in {time.time() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,91 +7,21 @@ Launch:
 
 import os, sys, sqlite3
 import streamlit as st
-import pandas as pd
-# ------------------------------------------------------------
-# 🌐 Temporary Diffusion Model Placeholder
-# ------------------------------------------------------------
-from PIL import Image, ImageDraw, ImageFilter
-import random
-
-def generate_downscaled_map(lat, lon):
-    """
-    Context-aware synthetic climate map generator.
-    Generates regional-like rainfall or heat intensity maps using smooth gradients and clusters.
-    """
-    width, height = 512, 320
-    img = Image.new("RGB", (width, height), color=(245, 248, 255))
-    draw = ImageDraw.Draw(img)
-
-    # --- Generate layered gradient base ---
-    base_color = (180, 210, 255)  # light sky tone
-    for y in range(height):
-        factor = y / height
-        r = int(base_color[0] * (1 - 0.3 * factor))
-        g = int(base_color[1] * (1 - 0.5 * factor))
-        b = int(base_color[2] * (1 - 0.7 * factor))
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
-
-    # --- Simulate rainfall/heat zones ---
-    for _ in range(10):  # clusters
-        cx = random.randint(100, width - 100)
-        cy = random.randint(60, height - 60)
-        radius = random.randint(40, 100)
-
-        # Choose weather type (rain or heat)
-        if random.random() < 0.6:
-            # Rain zone (blue/green gradient)
-            fill_color = (
-                random.randint(0, 80),
-                random.randint(100, 180),
-                random.randint(200, 255),
-            )
-        else:
-            # Heat zone (orange/red)
-            fill_color = (
-                random.randint(200, 255),
-                random.randint(100, 150),
-                random.randint(60, 80),
-            )
-
-        for r in range(radius, 0, -1):
-            alpha = int(255 * (1 - r / radius) ** 2)
-            color = tuple(int(c * (r / radius)) for c in fill_color)
-            draw.ellipse(
-                [(cx - r, cy - r), (cx + r, cy + r)],
-                fill=color,
-                outline=None,
-            )
-
-    # --- Add topographic grid lines ---
-    for i in range(0, width, 64):
-        draw.line([(i, 0), (i, height)], fill=(220, 220, 220), width=1)
-    for j in range(0, height, 64):
-        draw.line([(0, j), (width, j)], fill=(220, 220, 220), width=1)
-
-    # --- Add title & coordinate overlay ---
-    header_box = [(10, 10), (width - 10, 55)]
-    draw.rectangle(header_box, fill=(255, 255, 255, 220))
-    draw.text((20, 18), f"Synthetic Climate Map\nLat {lat:.2f}, Lon {lon:.2f}", fill=(50, 50, 50))
-
-    # --- Apply blur & contrast for realism ---
-    img = img.filter(ImageFilter.GaussianBlur(radius=1.0))
-
-    return img
-
-
-
-import matplotlib.pyplot as plt
-from datetime import datetime
-
-# Local imports
-from services.genai_service import answer_query
-from services.climate_api_service import fetch_weather_summary
+# ------------------------------------------------------------
+# 🌐 Temporary Diffusion Model Placeholder (see utils/map_renderer.py)
+# ------------------------------------------------------------
+from utils.map_renderer import render_map_png, render_weather_grid
+
+from datetime import datetime, timedelta
+
+# Local imports (the answer pipeline, pandas and matplotlib are imported where they are
+# used, so the first page renders without waiting for LangChain / torch)
+from services.climate_api_service import fetch_weather_summary, fetch_weather_grid
+from services.warmup import start_warmup, warmup_status
 from utils.logger import get_logger
-from utils.auto_rebuild import auto_rebuild_vectorstore
 from utils.web_search import perform_web_search
-from utils.feedback_db import store_feedback_db, get_feedback_entries
-from config.config import DEFAULT_LAT, DEFAULT_LON
+from utils.feedback_db import store_feedback_db, get_feedback_stats
+from config.config import DEFAULT_LAT, DEFAULT_LON, FAST_START
 
 logger = get_logger("app")
 
@@ -458,11 +388,13 @@ mode = st.sidebar.selectbox("Response Mode", ["concise", "detailed"])
 
 # ✅ Correct Synthetic Map Toggle (single definition)
 generate_map = st.sidebar.checkbox("🌍 Generate Synthetic Map", value=False)
+map_layer = st.sidebar.selectbox("🌡️ Live Map Layer", ["temperature_2m", "precipitation"])
 
 
 # Web Search Integration
 st.sidebar.markdown("### 🌐 Web Search Integration")
 web_search_enabled = st.sidebar.checkbox("Enable Live Web Search", value=True)
+web_in_answers = st.sidebar.checkbox("Include web results in answers", value=False)
 if web_search_enabled:
     st.sidebar.info("When enabled, the chatbot can search the web for real-time information.")
     if st.sidebar.button("🌍 Run Live Web Search"):
@@ -476,12 +408,14 @@ if web_search_enabled:
 # ------------------------------------------------------------
 # Auto Rebuild Vectorstore
 # ------------------------------------------------------------
-if "vectorstore_checked" not in st.session_state:
-    with st.spinner("🔄 Initializing knowledge base…"):
-        try:
-            auto_rebuild_vectorstore()
-        except Exception as e:
-            st.sidebar.warning(f"⚠️ Vectorstore rebuild skipped: {e}")
+if FAST_START:
+    # Knowledge-base check, model and index loading run once per process in the background
+    start_warmup()
+elif "vectorstore_checked" not in st.session_state:
+    # Rebuilds run in the background and swap in the new index when done
+    from utils.auto_rebuild import start_background_rebuild
+
+    start_background_rebuild()
     st.session_state.vectorstore_checked = True
 
 # ------------------------------------------------------------
@@ -580,7 +514,7 @@ with col2:
 if st.button("🗺️ Generate Synthetic Map"):
     with st.spinner("🌀 Generating synthetic map..."):
         try:
-            map_image = generate_downscaled_map(lat, lon)
+            map_image = render_map_png(lat, lon)
             if map_image:
                 st.image(map_image, use_container_width=True)
 
@@ -622,18 +556,45 @@ if st.button("🗺️ Generate Synthetic Map"):
         except Exception as e:
             st.error(f"🚫 Error while generating synthetic map: {e}")
 
+# Live gridded weather around the selected location (batched Open-Meteo requests)
+if st.button("🌡️ Show Live Weather Map"):
+    with st.spinner("🛰️ Fetching live weather grid..."):
+        grid = fetch_weather_grid(lat, lon, map_layer)
+        if grid is not None:
+            try:
+                st.image(render_weather_grid(grid, lat, lon), use_container_width=True)
+                st.caption(f"Open-Meteo current {map_layer} on a {len(grid['lats'])}×{len(grid['lons'])} "
+                           f"grid around ({lat:.2f}, {lon:.2f}), fetched in {grid['requests']} request(s).")
+            except Exception as e:
+                st.error(f"🚫 Error while rendering weather map: {e}")
+        else:
+            st.warning("⚠️ Live weather grid unavailable.")
+
 
 
 if st.button("Send") and user_input.strip():
     st.session_state["last_user_query"] = user_input
     st.session_state.messages.append({"role": "user", "content": user_input})
-    with st.spinner("🤖 Generating insight…"):
-        try:
-            answer, meta = answer_query(user_input, lat, lon, mode=mode)
-            st.session_state.messages.append({"role": "assistant", "content": answer})
-        except Exception as e:
-            logger.error(f"Response failed: {e}")
-            st.session_state.messages.append({"role": "assistant", "content": f"⚠️ Error: {e}"})
+    # Stream tokens into a placeholder so the first words show up as soon as they exist
+    placeholder = st.empty()
+    placeholder.markdown("🤖 Generating insight…")
+    try:
+        from services.genai_service import answer_query_stream
+
+        streamed, answer, meta = "", None, {}
+        for kind, payload in answer_query_stream(user_input, lat, lon, mode=mode, web_search=web_in_answers):
+            if kind == "token":
+                streamed += payload
+                placeholder.markdown(f"**🤖 Assistant**\n\n{streamed}▌")
+            else:
+                answer, meta = payload["answer"], payload
+        placeholder.empty()
+        st.session_state.messages.append({"role": "assistant", "content": answer or streamed})
+        st.session_state["last_trace"] = meta.get("trace")
+    except Exception as e:
+        placeholder.empty()
+        logger.error(f"Response failed: {e}")
+        st.session_state.messages.append({"role": "assistant", "content": f"⚠️ Error: {e}"})
 
 # ------------------------------------------------------------
 # 💬 Chat Bubble Design (modern Cortex style)
@@ -747,17 +708,19 @@ if st.sidebar.button("🌤 Fetch Live Weather Summary"):
 # Feedback Analytics Panel
 # ------------------------------------------------------------
 st.sidebar.markdown("### 📈 Feedback Analytics")
-entries = get_feedback_entries(limit=50)
-if entries:
-    df = pd.DataFrame(entries, columns=["timestamp", "question", "feedback"])
-    correct = df[df["feedback"] == "Correct"].shape[0]
-    total = len(df)
-    acc = (correct / total) * 100 if total else 0
-    st.sidebar.metric("✅ Accuracy Rate", f"{acc:.1f}%")
-    st.sidebar.metric("💬 Total Feedback", total)
-    counts = df["feedback"].value_counts()
+# Counts come from the pre-aggregated rollups and cover the full history
+stats = get_feedback_stats()
+if stats["total"]:
+    week = get_feedback_stats(start=datetime.now() - timedelta(days=7))
+    st.sidebar.metric("✅ Accuracy Rate", f"{stats['accuracy']:.1f}%",
+                      delta=f"{week['accuracy']:.1f}% last 7 days" if week["total"] else None,
+                      delta_color="off")
+    st.sidebar.metric("💬 Total Feedback", stats["total"])
+    counts = sorted(stats["by_label"].items(), key=lambda kv: kv[1], reverse=True)
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(figsize=(3,2))
-    ax.bar(counts.index, counts.values, color=["#0ff6b3","#f87171"])
+    ax.bar([label for label, _ in counts], [n for _, n in counts], color=["#0ff6b3","#f87171"])
     ax.set_title("Feedback Distribution", color="#0ff6b3")
     st.sidebar.pyplot(fig)
 else:
@@ -781,6 +744,20 @@ st.sidebar.markdown("---")
 if st.sidebar.checkbox("🧩 Developer Mode"):
     st.sidebar.text(f"Project Path:\n{os.path.abspath(os.getcwd())}")
     st.sidebar.text("Model: llama-3.3-70b-versatile\nAPI: Groq-compatible\nWeather: Open-Meteo")
+    warmup = warmup_status()
+    st.sidebar.text(f"Warm-up: {warmup['state']} {warmup['steps']}"
+                    + (f"\n⚠️ {warmup['error']}" if warmup["error"] else ""))
+    last_trace = st.session_state.get("last_trace")
+    if last_trace:
+        import pandas as pd
+        st.sidebar.markdown(
+            f"**⏱️ Last request:** {last_trace['duration_ms']:.0f} ms • "
+            f"{last_trace['prompt_tokens']} prompt / {last_trace['completion_tokens']} completion tokens"
+        )
+        st.sidebar.dataframe(pd.DataFrame(
+            [{"stage": s["name"], "start ms": s["start_ms"], "ms": s["duration_ms"], "status": s["status"]}
+             for s in last_trace["spans"]]
+        ), hide_index=True)
 
 # Footer
 st.markdown("\n<footer>🌱 AI ClimaSense © 2025 • Powered by Retrieval-Augmented Intelligence</footer>", unsafe_allow_html=True)
@@ -0,0 +1,108 @@
+"""
+Import-time report for the app and CLI entry modules.
+
+Each module is imported in a fresh interpreter with `python -X importtime`. The
+report shows the total cold import time, the heaviest imports it pulls in, and
+the self time summed per top-level package (which libraries dominate startup).
+
+Usage:
+    python -m benchmarks.import_time [module ...] [--top 15] [--json report.json]
+"""
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+DEFAULT_MODULES = [
+    "services.genai_service",
+    "services.climate_api_service",
+    "services.warmup",
+    "chains.weather_chain",
+    "utils.data_utils",
+    "utils.feedback_db",
+    "utils.map_renderer",
+    "answer_batch",
+    "build_vectorstore",
+    "pdf_to_text_batch",
+]
+
+
+def profile_import(module: str) -> dict:
+    """Runs `import module` under -X importtime and parses the per-module timings (µs)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        self_us, cumulative_us, name = int(parts[0]), int(parts[1]), parts[2]
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        imports.append({"module": name.strip(), "self_us": self_us,
+                        "cumulative_us": cumulative_us, "depth": depth})
+
+    # Children are printed before their parent: the target's subtree is everything after
+    # the previous top-level entry (interpreter startup imports such as site come first)
+    top = [n for n, i in enumerate(imports) if i["depth"] == 0]
+    end = next((n for n in top if imports[n]["module"] == module), None)
+    if end is not None:
+        start = max([n for n in top if n < end], default=-1) + 1
+        imports = imports[start:end + 1]
+
+    by_package = defaultdict(int)
+    for imp in imports:
+        by_package[imp["module"].split(".")[0]] += imp["self_us"]
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        "total_ms": round(sum(i["cumulative_us"] for i in imports if i["depth"] == 0) / 1000, 1),
+        "modules_loaded": len(imports),
+        "heaviest": sorted(imports, key=lambda i: i["cumulative_us"], reverse=True),
+        "packages_ms": {p: round(us / 1000, 1) for p, us in
+                        sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-module cold import cost.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=10, help="heaviest imports / packages to show")
+    parser.add_argument("--json", help="also write the full report to this file")
+    args = parser.parse_args()
+
+    reports = []
+    print(f"{'module':<32} {'import ms':>10} {'modules':>8}   heaviest packages (self ms)")
+    for module in args.modules:
+        r = profile_import(module)
+        reports.append(r)
+        if not r["ok"]:
+            print(f"{module:<32} {'failed':>10}   {r['error']}")
+            continue
+        packages = ", ".join(f"{p} {ms:.0f}" for p, ms in list(r["packages_ms"].items())[:5])
+        print(f"{module:<32} {r['total_ms']:>10.1f} {r['modules_loaded']:>8}   {packages}")
+
+    for r in reports:
+        if not r["ok"]:
+            continue
+        print(f"\n📦 {r['module']} — {r['total_ms']:.1f} ms, heaviest imports (cumulative ms):")
+        shown = 0
+        for imp in r["heaviest"]:
+            if imp["module"] == r["module"]:
+                continue
+            print(f"   {imp['cumulative_us'] / 1000:>9.1f}  {'  ' * min(imp['depth'], 4)}{imp['module']}")
+            shown += 1
+            if shown >= args.top:
+                break
+
+    if args.json:
+        for r in reports:
+            r["heaviest"] = r["heaviest"][:args.top]
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
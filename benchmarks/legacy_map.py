@@ -0,0 +1,73 @@
+"""
+The original synthetic map renderer (one PIL draw call per gradient row and cluster
+ring, then a full-image Gaussian blur), kept as the reference for the map stages of
+run_benchmarks.py. The app uses utils/map_renderer.py.
+"""
+import random
+
+from PIL import Image, ImageDraw, ImageFilter
+
+
+def legacy_downscaled_map(lat, lon):
+    """
+    Original draw-call renderer (unseeded).
+    Generates regional-like rainfall or heat intensity maps using smooth gradients and clusters.
+    """
+    width, height = 512, 320
+    img = Image.new("RGB", (width, height), color=(245, 248, 255))
+    draw = ImageDraw.Draw(img)
+
+    # --- Generate layered gradient base ---
+    base_color = (180, 210, 255)  # light sky tone
+    for y in range(height):
+        factor = y / height
+        r = int(base_color[0] * (1 - 0.3 * factor))
+        g = int(base_color[1] * (1 - 0.5 * factor))
+        b = int(base_color[2] * (1 - 0.7 * factor))
+        draw.line([(0, y), (width, y)], fill=(r, g, b))
+
+    # --- Simulate rainfall/heat zones ---
+    for _ in range(10):  # clusters
+        cx = random.randint(100, width - 100)
+        cy = random.randint(60, height - 60)
+        radius = random.randint(40, 100)
+
+        # Choose weather type (rain or heat)
+        if random.random() < 0.6:
+            # Rain zone (blue/green gradient)
+            fill_color = (
+                random.randint(0, 80),
+                random.randint(100, 180),
+                random.randint(200, 255),
+            )
+        else:
+            # Heat zone (orange/red)
+            fill_color = (
+                random.randint(200, 255),
+                random.randint(100, 150),
+                random.randint(60, 80),
+            )
+
+        for r in range(radius, 0, -1):
+            color = tuple(int(c * (r / radius)) for c in fill_color)
+            draw.ellipse(
+                [(cx - r, cy - r), (cx + r, cy + r)],
+                fill=color,
+                outline=None,
+            )
+
+    # --- Add topographic grid lines ---
+    for i in range(0, width, 64):
+        draw.line([(i, 0), (i, height)], fill=(220, 220, 220), width=1)
+    for j in range(0, height, 64):
+        draw.line([(0, j), (width, j)], fill=(220, 220, 220), width=1)
+
+    # --- Add title & coordinate overlay ---
+    header_box = [(10, 10), (width - 10, 55)]
+    draw.rectangle(header_box, fill=(255, 255, 255, 220))
+    draw.text((20, 18), f"Synthetic Climate Map\nLat {lat:.2f}, Lon {lon:.2f}", fill=(50, 50, 50))
+
+    # --- Apply blur & contrast for realism ---
+    img = img.filter(ImageFilter.GaussianBlur(radius=1.0))
+
+    return img
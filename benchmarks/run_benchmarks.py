@@ -0,0 +1,322 @@
+"""
+Per-stage micro-benchmarks for the ClimaSense pipeline.
+
+Every stage is timed on its own against the real knowledge-base corpus:
+chunking, embedding, FAISS build/search, BM25, prompt assembly, the chain with a
+canned LLM, weather fetch + parsing, format_response, feedback DB writes and the
+downscaled map. The LLM and Open-Meteo are replaced by local stand-ins
+(benchmarks/stubs.py), so no API keys or network access are needed.
+
+Results are written as JSON; pass --baseline with an earlier results file to flag
+stages whose median time regressed by more than --threshold.
+
+Usage:
+    python -m benchmarks.run_benchmarks [--output benchmarks/results/latest.json]
+        [--baseline old.json] [--threshold 0.25] [--repeat 5] [--fake-embeddings]
+"""
+import os
+import sys
+import json
+import glob
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.legacy_map import legacy_downscaled_map
+from benchmarks.stubs import FakeOpenMeteo, CANNED_ANSWER, fake_llm, fake_embeddings
+
+SAMPLE_QUERIES = [
+    "How does rising temperature affect rice yield in Tamil Nadu?",
+    "Which districts are most vulnerable to drought?",
+    "What adaptation strategies help rainfed farmers?",
+    "Will it rain this week and should I irrigate my paddy?",
+    "How can crop insurance reduce climate risk for smallholders?",
+    "What is the projected change in monsoon rainfall?",
+    "Which millet varieties tolerate heat stress?",
+    "How does humidity influence pest outbreaks in cotton?",
+]
+
+
+def _measure(fn, repeat: int, warmup: int = 1, items: int = None) -> dict:
+    """Times `repeat` calls of fn() after `warmup` untimed calls; per-call stats in ms."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings = np.asarray(timings)
+    result = {
+        "runs": repeat,
+        "mean_ms": round(float(timings.mean()), 4),
+        "p50_ms": round(float(np.percentile(timings, 50)), 4),
+        "p95_ms": round(float(np.percentile(timings, 95)), 4),
+        "min_ms": round(float(timings.min()), 4),
+    }
+    if items:
+        result["items"] = items
+        result["items_per_s"] = round(items / (float(np.percentile(timings, 50)) / 1000), 1)
+    return result
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _load_corpus(kb_dir: str) -> dict:
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(kb_dir, "*.txt"))):
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            corpus[os.path.basename(path)] = f.read()
+    return corpus
+
+
+def run(args) -> dict:
+    # The Open-Meteo stand-in must be configured before the pipeline modules are imported
+    meteo = FakeOpenMeteo().start()
+    os.environ["OPEN_METEO_BASE"] = meteo.url
+
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    from config.config import DEFAULT_LAT, DEFAULT_LON
+    from config.constants import (
+        KNOWLEDGE_DIR, KB_CHUNK_SIZE, KB_CHUNK_OVERLAP, EMBEDDING_MODEL, RAG_TOP_K,
+    )
+    from chains.hybrid_chain import build_hybrid_prompt, make_hybrid_inputs
+    from chains.rag_chain import format_chunks
+    from chains.weather_chain import get_weather_data, _fetch_current
+    from utils import feedback_db
+    from utils.bm25 import BM25Index
+    from utils.data_utils import chunk_text, iter_text_chunks
+    from utils.faiss_index import create_index, configure_search
+    from utils import map_renderer
+    from utils.response_modes import format_response
+    from utils.weather_grid import fetch_weather_grid, grid_axes
+
+    stages = {}
+    repeat = args.repeat
+
+    def report(name, result):
+        stages[name] = result
+        print(f"⏱️  {name:<24} p50 {result['p50_ms']:>10.3f} ms   p95 {result['p95_ms']:>10.3f} ms"
+              + (f"   {result['items_per_s']:>10.1f} items/s" if "items_per_s" in result else ""))
+
+    # --- 1. Corpus + chunking
+    corpus = _load_corpus(args.kb_dir or KNOWLEDGE_DIR)
+    if not corpus:
+        raise SystemExit(f"❌ No .txt files found in {args.kb_dir or KNOWLEDGE_DIR}")
+    texts = list(corpus.values())
+    n_chars = sum(len(t) for t in texts)
+    print(f"📚 Corpus: {len(texts)} files, {n_chars / 1e6:.2f} M characters")
+
+    report("chunk_text", _measure(lambda: [chunk_text(t) for t in texts], repeat, items=n_chars))
+    splitter = RecursiveCharacterTextSplitter(chunk_size=KB_CHUNK_SIZE, chunk_overlap=KB_CHUNK_OVERLAP)
+    report("kb_text_splitter", _measure(lambda: [splitter.split_text(t) for t in texts],
+                                        repeat, items=n_chars))
+    block = 64 * 1024      # streamed in read-sized blocks, as ingestion reads files
+    report("kb_stream_chunker", _measure(
+        lambda: [sum(1 for _ in iter_text_chunks(t[i:i + block] for i in range(0, len(t), block)))
+                 for t in texts], repeat, items=n_chars))
+    chunks = [c for t in texts for c in splitter.split_text(t)]
+    if args.max_chunks:
+        chunks = chunks[:args.max_chunks]
+
+    # --- 2. Embedding (the model itself, bypassing the on-disk embedding cache)
+    if args.fake_embeddings:
+        embeddings = fake_embeddings()
+    else:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    holder = {}
+
+    def embed_corpus():
+        holder["vectors"] = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32)
+
+    report("embed_documents", _measure(embed_corpus, repeat=1, warmup=0, items=len(chunks)))
+    vectors = holder["vectors"]
+    query_vectors = np.asarray(embeddings.embed_documents(SAMPLE_QUERIES), dtype=np.float32)
+    report("embed_query", _measure(lambda: [embeddings.embed_query(q) for q in SAMPLE_QUERIES],
+                                   repeat, items=len(SAMPLE_QUERIES)))
+
+    # --- 3. FAISS build + search
+    def build_index():
+        index = create_index(args.index_type, vectors)
+        index.add(vectors)
+        holder["index"] = configure_search(index)
+
+    report(f"faiss_build_{args.index_type}", _measure(build_index, max(1, repeat // 2), warmup=0,
+                                                     items=len(vectors)))
+    index = holder["index"]
+    report(f"faiss_search_{args.index_type}", _measure(
+        lambda: [index.search(q.reshape(1, -1), RAG_TOP_K) for q in query_vectors],
+        repeat, items=len(query_vectors)))
+
+    # --- 4. Lexical retrieval
+    doc_ids = [str(i) for i in range(len(chunks))]
+    report("bm25_build", _measure(lambda: holder.update(bm25=BM25Index.build(doc_ids, chunks)),
+                                  max(1, repeat // 2), warmup=0, items=len(chunks)))
+    bm25 = holder["bm25"]
+    report("bm25_search", _measure(lambda: [bm25.search(q, RAG_TOP_K) for q in SAMPLE_QUERIES],
+                                   repeat, items=len(SAMPLE_QUERIES)))
+
+    # --- 5. Prompt assembly and the chain with a canned LLM
+    _, top = index.search(query_vectors[:1], RAG_TOP_K)
+    retrieved = [{"rank": r, "content": chunks[i], "source": "benchmark"}
+                 for r, i in enumerate(top[0], start=1) if i >= 0]
+    weather_text = get_weather_data(SAMPLE_QUERIES[3], DEFAULT_LAT, DEFAULT_LON)
+    prompt = build_hybrid_prompt()
+
+    def assemble_prompt():
+        inputs = make_hybrid_inputs(SAMPLE_QUERIES[3], "detailed", format_chunks(retrieved), weather_text)
+        return prompt.invoke(inputs).to_string()
+
+    report("prompt_assembly", _measure(assemble_prompt, repeat * 20))
+    chain = prompt | fake_llm() | StrOutputParser()
+    inputs = make_hybrid_inputs(SAMPLE_QUERIES[3], "detailed", format_chunks(retrieved), weather_text)
+    report("chain_invoke_stub_llm", _measure(lambda: chain.invoke(inputs), repeat * 5))
+
+    # --- 6. Weather: upstream fetch + parse (a new grid cell each call) and cached parse
+    cell = {"n": 0}
+
+    def weather_cold():
+        cell["n"] += 1
+        return get_weather_data(SAMPLE_QUERIES[3], DEFAULT_LAT + cell["n"], DEFAULT_LON)
+
+    report("weather_fetch_parse", _measure(weather_cold, repeat * 5))
+    report("weather_parse_cached", _measure(
+        lambda: get_weather_data(SAMPLE_QUERIES[3], DEFAULT_LAT, DEFAULT_LON), repeat * 20))
+
+    # Gridded weather (17 x 17 points): batched multi-location requests vs one call per point
+    box = (DEFAULT_LAT - 0.8, DEFAULT_LON - 0.8, DEFAULT_LAT + 0.8, DEFAULT_LON + 0.8)
+    grid_lats, grid_lons = grid_axes(*box)
+    report("weather_grid_batched", _measure(lambda: fetch_weather_grid(*box), repeat,
+                                            items=grid_lats.size * grid_lons.size))
+    report("weather_grid_point_calls", _measure(
+        lambda: [_fetch_current(a, b) for a in grid_lats for b in grid_lons], repeat,
+        items=grid_lats.size * grid_lons.size))
+
+    # --- 7. Response formatting
+    long_answer = " ".join([CANNED_ANSWER] * 4)
+    report("format_response", _measure(
+        lambda: [format_response(long_answer, mode=m) for m in ("concise", "detailed") * 500],
+        repeat, items=1000))
+
+    # --- 8. Feedback DB writes (throwaway database)
+    with tempfile.TemporaryDirectory() as tmp:
+        real_db_path = feedback_db.DB_PATH
+        feedback_db.DB_PATH = os.path.join(tmp, "feedback.db")
+        try:
+            writes = 50
+
+            def write_feedback():
+                for _ in range(writes):
+                    feedback_db.store_feedback_db(SAMPLE_QUERIES[0], CANNED_ANSWER, "👍")
+                feedback_db.flush()     # time until the rows are committed
+
+            report("feedback_db_write", _measure(write_feedback, repeat, items=writes))
+        finally:
+            feedback_db.close()
+            feedback_db.DB_PATH = real_db_path
+
+    # --- 9. Downscaled map: legacy draw calls vs the NumPy renderer vs the PNG cache
+    report("map_legacy_draw", _measure(
+        lambda: legacy_downscaled_map(DEFAULT_LAT, DEFAULT_LON), repeat))
+    report("generate_downscaled_map", _measure(
+        lambda: map_renderer.generate_downscaled_map(DEFAULT_LAT, DEFAULT_LON), repeat))
+    report("generate_downscaled_map_2k", _measure(
+        lambda: map_renderer.generate_downscaled_map(DEFAULT_LAT, DEFAULT_LON, 2048, 1280), repeat))
+    map_renderer.render_map_png(DEFAULT_LAT, DEFAULT_LON)
+    report("render_map_png_cached", _measure(
+        lambda: map_renderer.render_map_png(DEFAULT_LAT, DEFAULT_LON), repeat))
+
+    meteo.stop()
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus_files": len(texts),
+            "corpus_chars": n_chars,
+            "chunks": len(chunks),
+            "embeddings": "fake" if args.fake_embeddings else EMBEDDING_MODEL,
+            "index_type": args.index_type,
+            "repeat": repeat,
+            "weather_stub_requests": meteo.requests,
+        },
+        "stages": stages,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Stages whose p50 grew by more than `threshold` (fraction) relative to the baseline."""
+    regressions = []
+    print(f"\n{'stage':<26} {'base p50':>11} {'new p50':>11} {'change':>8}")
+    for name, new in results["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old or not old.get("p50_ms"):
+            continue
+        change = new["p50_ms"] / old["p50_ms"] - 1
+        flag = " ⚠️" if change > threshold else ""
+        print(f"{name:<26} {old['p50_ms']:>11.3f} {new['p50_ms']:>11.3f} {change:>+8.1%}{flag}")
+        if change > threshold:
+            regressions.append({"stage": name, "baseline_p50_ms": old["p50_ms"],
+                                "p50_ms": new["p50_ms"], "change": round(change, 4)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage pipeline benchmarks with offline stubs.")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "latest.json"))
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed p50 slowdown per stage before it counts as a regression")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--kb-dir", help="corpus directory (default: KNOWLEDGE_DIR)")
+    parser.add_argument("--max-chunks", type=int, help="cap on chunks embedded and indexed")
+    parser.add_argument("--index-type", default=None, help="FAISS index type (default: FAISS_INDEX_TYPE)")
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="hash-based embeddings instead of the sentence-transformer model")
+    args = parser.parse_args()
+    if args.index_type is None:
+        from config.constants import FAISS_INDEX_TYPE
+        args.index_type = FAISS_INDEX_TYPE
+
+    results = run(args)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        results["baseline"] = {
+            "path": args.baseline,
+            "git_revision": baseline.get("meta", {}).get("git_revision"),
+            "threshold": args.threshold,
+            "regressions": compare(results, baseline, args.threshold),
+        }
+        if results["baseline"]["regressions"]:
+            print(f"❌ {len(results['baseline']['regressions'])} stage(s) regressed "
+                  f"by more than {args.threshold:.0%}")
+            exit_code = 1
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
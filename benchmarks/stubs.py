@@ -0,0 +1,136 @@
+"""
+Offline stand-ins used by the benchmark suite: a local Open-Meteo server and a
+canned-response chat model, so every stage can be timed without network access.
+"""
+import json
+import math
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+CANNED_ANSWER = (
+    "Paddy sown in early June benefits from the onset of the south-west monsoon. "
+    "Expect moderate rainfall over the next week; delay fertiliser application until "
+    "after heavy showers and keep field bunds intact to retain moisture. "
+    "Short-duration, drought-tolerant varieties reduce risk if monsoon onset is late. "
+    "Monitor for blast and brown spot after prolonged leaf wetness."
+)
+
+
+def _series(name: str, lat: float, lon: float, n: int):
+    """Deterministic, smoothly varying values for one Open-Meteo variable."""
+    base = 20.0 + 10.0 * math.cos(math.radians(lat)) + (lon % 7)
+    if "precipitation" in name:
+        return [round(max(0.0, 3 * math.sin((i + lat) / 5.0)), 2) for i in range(n)]
+    if "wind" in name:
+        return [round(2.0 + abs(math.sin((i + lon) / 9.0)) * 6, 2) for i in range(n)]
+    if name.endswith("_min"):
+        base -= 6
+    elif name.endswith("_max"):
+        base += 6
+    return [round(base + 4 * math.sin(i / 3.8), 2) for i in range(n)]
+
+
+def _location_payload(lat: float, lon: float, query: dict) -> dict:
+    payload = {"latitude": lat, "longitude": lon, "timezone": "GMT", "elevation": 10.0}
+    start = datetime(2024, 6, 1)
+    for section, n, step in (("current", 1, None), ("hourly", 168, timedelta(hours=1)),
+                             ("daily", 7, timedelta(days=1))):
+        names = [v for v in ",".join(query.get(section, [])).split(",") if v]
+        if not names:
+            continue
+        if section == "current":
+            payload["current"] = {"time": start.strftime("%Y-%m-%dT%H:%M"), "interval": 900}
+            payload["current"].update({v: _series(v, lat, lon, 1)[0] for v in names})
+            continue
+        fmt = "%Y-%m-%dT%H:%M" if section == "hourly" else "%Y-%m-%d"
+        times = [(start + i * step).strftime(fmt) for i in range(n)]
+        payload[section] = {"time": times}
+        payload[section].update({v: _series(v, lat, lon, n) for v in names})
+    return payload
+
+
+class _OpenMeteoHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        try:
+            lats = [float(x) for x in ",".join(query["latitude"]).split(",")]
+            lons = [float(x) for x in ",".join(query["longitude"]).split(",")]
+            if len(lats) != len(lons):
+                raise ValueError("latitude and longitude must have the same length")
+        except (KeyError, ValueError) as e:
+            self._send(400, {"error": True, "reason": str(e)})
+            return
+        self.server.requests += 1
+        if self.server.status != 200:
+            self._send(self.server.status, {"error": True, "reason": "stub failure"})
+            return
+        payloads = [_location_payload(lat, lon, query) for lat, lon in zip(lats, lons)]
+        # Like Open-Meteo: one object for a single location, a list for several
+        self._send(200, payloads[0] if len(payloads) == 1 else payloads)
+
+    def _send(self, status: int, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeOpenMeteo:
+    """
+    Local Open-Meteo forecast endpoint on 127.0.0.1 (random free port).
+    A `status` other than 200 makes every request fail with that HTTP status.
+
+        with FakeOpenMeteo() as meteo:
+            os.environ["OPEN_METEO_BASE"] = meteo.url
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, status: int = 200):
+        self.server = ThreadingHTTPServer((host, port), _OpenMeteoHandler)
+        self.server.daemon_threads = True
+        self.server.requests = 0
+        self.server.status = status
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1/forecast"
+
+    @property
+    def requests(self) -> int:
+        return self.server.requests
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def fake_llm(answer: str = CANNED_ANSWER):
+    """Chat model that always replies with `answer` (streams it character by character)."""
+    from langchain_core.language_models import FakeListChatModel
+
+    return FakeListChatModel(responses=[answer])
+
+
+def fake_embeddings(size: int = 384):
+    """Deterministic hash-based embeddings with the dimension of the default model."""
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    return DeterministicFakeEmbedding(size=size)
@@ -1,5 +1,25 @@
+import sys
 from utils.data_utils import build_vectorstore_from_local_docs
 
 if __name__ == "__main__":
-    build_vectorstore_from_local_docs()
-    print("✅ Vectorstore successfully built and saved in data/vectorstore/")
\ No newline at end of file
+    shards = build_vectorstore_from_local_docs()
+    print("✅ Vectorstore successfully built; data/vectorstore/CURRENT points at the latest version")
+    for name, db in shards.items():
+        print(f"   shard {name}: {db.index.ntotal} vectors")
+
+    # Optional: python build_vectorstore.py --compare-index-types (over all shards' vectors)
+    if shards and "--compare-index-types" in sys.argv:
+        import numpy as np
+        from utils.faiss_index import compare_index_types
+
+        vectors = np.concatenate([
+            np.asarray(db.embedding_function.embed_documents(
+                [db.docstore.search(i).page_content for i in db.index_to_docstore_id.values()]
+            ), dtype=np.float32)
+            for db in shards.values()
+        ])
+        print(f"\n{'type':<7} {'size MB':>9} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7}")
+        for r in compare_index_types(vectors):
+            recall = next(v for k, v in r.items() if k.startswith("recall@"))
+            print(f"{r['index_type']:<7} {r['size_bytes'] / 1e6:>9.2f} {r['build_s']:>8.3f} "
+                  f"{r['search']['p50_ms']:>8.4f} {r['search']['p95_ms']:>8.4f} {recall:>7.3f}")
@@ -3,31 +3,52 @@ Hybrid Chain — Merges RAG (static reports) with live weather data
 to generate a unified AI-driven agricultural reasoning response.
 """
 
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from services.llm_client import get_llm
-from chains.rag_chain import get_rag_response
-from chains.weather_chain import get_weather_data
+from chains.rag_chain import get_rag_response, retrieve_context, format_chunks
+from chains.weather_chain import fetch_weather_context, needs_weather
+from config.config import DEFAULT_LAT, DEFAULT_LON
+from config.constants import (
+    CONTEXT_POOL_WORKERS, RAG_STAGE_TIMEOUT, RETRIEVAL_STAGE_TIMEOUT, WEATHER_STAGE_TIMEOUT,
+    WEB_SEARCH_STAGE_TIMEOUT, HYBRID_CONTEXT_MODE,
+)
+from utils import http_client
+from utils.logger import get_logger
+from utils.tracing import span
+from utils.token_usage import TokenUsage
+from utils.web_search import perform_web_search
 
+logger = get_logger("hybrid_chain")
 
-def build_hybrid_chain():
+# One pool per context stage, so a hanging upstream (e.g. weather) cannot occupy the
+# workers that retrieval needs
+_stage_pools = {
+    name: ThreadPoolExecutor(max_workers=CONTEXT_POOL_WORKERS, thread_name_prefix=f"context-{name}")
+    for name in ("rag", "weather", "web_search")
+}
+
+
+def build_hybrid_prompt() -> PromptTemplate:
     """
-    Build a unified hybrid chain that merges:
-      - Static RAG knowledge
-      - Live weather data context
-      - User query + reasoning mode
+    Prompt shared by the hybrid chain; kept separate so it can be assembled
+    (and benchmarked) without an LLM.
     """
-    llm = get_llm()
-
     # ✅ Use PromptTemplate (works well with Groq / OpenAI-compatible LLMs)
-    prompt = PromptTemplate(
-        input_variables=["rag_context", "weather_context", "user_query", "mode"],
+    return PromptTemplate(
+        input_variables=["rag_context", "weather_context", "web_context", "user_query", "mode"],
         template=(
             "You are an agricultural and climate domain expert.\n\n"
             "STATIC KNOWLEDGE (from research reports, datasets, and studies):\n"
             "{rag_context}\n\n"
             "LIVE WEATHER DATA (real-time observations):\n"
             "{weather_context}\n\n"
+            "LIVE WEB RESULTS:\n"
+            "{web_context}\n\n"
             "MODE: {mode}\n\n"
             "USER QUESTION:\n{user_query}\n\n"
             "Generate a comprehensive, factual, and actionable response using both sources.\n"
@@ -35,34 +56,205 @@ def build_hybrid_chain():
         ),
     )
 
+
+@lru_cache(maxsize=None)
+def build_hybrid_chain(temperature: float = 0.3, max_tokens: int = 512):
+    """
+    Build a unified hybrid chain that merges:
+      - Static RAG knowledge
+      - Live weather data context
+      - Optional live web search results
+      - User query + reasoning mode
+    The chain is stateless, so it is built once per LLM profile and reused.
+    """
+    llm = get_llm(temperature, max_tokens)
+    prompt = build_hybrid_prompt()
+
     # ✅ Combine into a simple runnable LangChain chain
     chain = prompt | llm | StrOutputParser()
     return chain
 
 
-def hybrid_response(user_query: str, mode: str = "detailed"):
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, round((time.perf_counter() - start) * 1000, 1)
+
+
+def _traced_stage(name, deadline, fn, *args):
+    # Outbound HTTP in the stage gives up (without retries) when the deadline passes
+    with span(f"context.{name}"), http_client.deadline(deadline):
+        return _timed(fn, *args)
+
+
+def run_stages(stages: dict):
     """
-    Unified hybrid reasoning flow that combines:
-      - Static RAG results (knowledge base)
-      - Real-time weather insights (API-driven)
+    Runs context stages {name: (fn, args, timeout)} concurrently on the per-stage pools,
+    each with its own deadline measured from the common start.
+    Returns (contexts, status): contexts maps stage name -> result for the stages that
+    finished in time; status holds "timed_out", "failed" (stage names) and "stage_ms".
+    """
+    start = time.monotonic()
+    # Each stage runs in a copy of the caller's context so its span joins the current trace
+    futures = {
+        name: _stage_pools[name].submit(contextvars.copy_context().run, _traced_stage,
+                                        name, start + timeout, fn, *args)
+        for name, (fn, args, timeout) in stages.items()
+    }
+    contexts = {}
+    status = {"timed_out": [], "failed": [], "stage_ms": {}}
+    for name, future in futures.items():
+        remaining = stages[name][2] - (time.monotonic() - start)
+        try:
+            contexts[name], status["stage_ms"][name] = future.result(timeout=max(remaining, 0))
+        except FutureTimeout:
+            future.cancel()
+            status["timed_out"].append(name)
+            logger.warning("Context stage '%s' missed its %.1fs deadline", name, stages[name][2])
+        except Exception as e:
+            status["failed"].append(name)
+            logger.error("Context stage '%s' failed: %s", name, e)
+    return contexts, status
+
+
+def gather_context(user_query: str, lat: float, lon: float, web_search: bool = False,
+                   context_mode: str = HYBRID_CONTEXT_MODE, mode: str = "detailed",
+                   filters: dict = None):
+    """
+    Runs the independent context stages concurrently, each with its own deadline
+    (measured from the common start). A stage that misses its deadline or fails is
+    left out of the prompt and reported in the returned metadata.
+    In "retrieval" mode the knowledge stage returns ranked chunks packed into the token
+    budget of the response `mode` (no LLM call); in "two_stage" mode it returns a RAG
+    LLM answer. `filters` ({"collection", "source", "year"}, see utils/kb_catalog.matches)
+    limits the knowledge stage to matching documents.
+    Returns (contexts, meta) where contexts maps stage name -> text;
+    meta["context_tokens"] reports the packed tokens vs. the budget.
+    """
+    if context_mode == "two_stage":
+        stages = {"rag": (get_rag_response, (user_query, mode, filters), RAG_STAGE_TIMEOUT)}
+    else:
+        stages = {"rag": (retrieve_context, (user_query, mode, filters), RETRIEVAL_STAGE_TIMEOUT)}
+    if needs_weather(user_query):
+        stages["weather"] = (fetch_weather_context, (user_query, lat, lon), WEATHER_STAGE_TIMEOUT)
+    if web_search:
+        stages["web_search"] = (perform_web_search, (user_query,), WEB_SEARCH_STAGE_TIMEOUT)
+
+    with span("gather_context", context_mode=context_mode) as gather_span:
+        contexts, status = run_stages(stages)
+        gather_span.set(timed_out=status["timed_out"], failed=status["failed"])
+    meta = {"context_mode": context_mode, "stages": list(stages), "filters": filters, **status}
+
+    if context_mode != "two_stage" and "rag" in contexts:
+        chunks, pack_stats = contexts["rag"]
+        meta["sources"] = [{"rank": c["rank"], "source": c["source"], "pages": c.get("pages")}
+                           for c in chunks]
+        meta["context_tokens"] = pack_stats
+        contexts["rag"] = format_chunks(chunks)
+    return contexts, meta
+
+
+def stage_text(contexts, meta, name, default):
+    """Prompt text for a context stage, noting when its source timed out or failed."""
+    if name in contexts and contexts[name]:
+        return contexts[name]
+    if name in meta["timed_out"]:
+        return f"{default} (source timed out; answer without it)"
+    if name in meta["failed"]:
+        return f"{default} (source unavailable)"
+    return default
+
+
+def build_hybrid_inputs(user_query: str, mode: str, lat: float, lon: float,
+                        web_search: bool = False, context_mode: str = HYBRID_CONTEXT_MODE,
+                        filters: dict = None):
     """
-    # Step 1 — Retrieve static knowledge context
-    rag_output = get_rag_response(user_query) or "No relevant static data found."
+    Gathers static knowledge, live weather and web context in parallel and maps them
+    onto the hybrid prompt variables. Returns (chain_inputs, context_meta).
+    """
+    contexts, context_meta = gather_context(
+        user_query, lat, lon, web_search=web_search, context_mode=context_mode, mode=mode,
+        filters=filters,
+    )
 
-    # Step 2 — Conditionally get live weather data if relevant
-    weather_keywords = ["weather", "rain", "temperature", "humidity", "climate", "forecast"]
-    if any(word in user_query.lower() for word in weather_keywords):
-        weather_output = get_weather_data(user_query)
+    rag_output = stage_text(contexts, context_meta, "rag", "No relevant static data found.")
+    if "weather" in context_meta["stages"]:
+        weather_output = stage_text(contexts, context_meta, "weather", "Weather data unavailable.")
     else:
         weather_output = "Weather data not relevant for this query."
+    if web_search:
+        web_output = stage_text(contexts, context_meta, "web_search", "No web results.")
+    else:
+        web_output = "Web search not requested."
 
-    # Step 3 — Build and run the hybrid chain
-    chain = build_hybrid_chain()
-    result = chain.invoke({
-        "rag_context": rag_output,
-        "weather_context": weather_output,
+    return make_hybrid_inputs(user_query, mode, rag_output, weather_output, web_output), context_meta
+
+
+def make_hybrid_inputs(user_query: str, mode: str, rag_context: str, weather_context: str,
+                       web_context: str = "Web search not requested."):
+    """Maps already-gathered context onto the hybrid prompt variables."""
+    return {
+        "rag_context": rag_context,
+        "weather_context": weather_context,
+        "web_context": web_context,
         "user_query": user_query,
         "mode": mode
-    })
+    }
+
+
+def hybrid_response(user_query: str, mode: str = "detailed",
+                    lat: float = DEFAULT_LAT, lon: float = DEFAULT_LON, web_search: bool = False,
+                    context_mode: str = HYBRID_CONTEXT_MODE, filters: dict = None):
+    """
+    Unified hybrid reasoning flow that combines:
+      - Static knowledge: ranked knowledge-base chunks ("retrieval", one LLM call in total)
+        or a RAG-generated answer ("two_stage", the original two-call behaviour)
+      - Real-time weather insights (API-driven) for the given coordinates
+      - Live web search results (optional)
+    The context sources are fetched concurrently; `filters` limits the knowledge
+    context (see gather_context). Returns (answer, context_meta).
+    """
+    with span("hybrid_response", mode=mode):
+        # Step 1 — Gather static knowledge, live weather and web context in parallel
+        inputs, context_meta = build_hybrid_inputs(
+            user_query, mode, lat, lon, web_search=web_search, context_mode=context_mode,
+            filters=filters,
+        )
+
+        # Step 2 — Run the (cached) hybrid chain
+        with span("llm.hybrid") as llm_span:
+            usage = TokenUsage()
+            result = build_hybrid_chain().invoke(inputs, config={"callbacks": [usage]})
+            usage.attach(llm_span)
+
+    return result, context_meta
+
+
+def hybrid_stream(user_query: str, mode: str = "detailed",
+                  lat: float = DEFAULT_LAT, lon: float = DEFAULT_LON, web_search: bool = False,
+                  context_mode: str = HYBRID_CONTEXT_MODE, filters: dict = None):
+    """
+    Streaming variant of hybrid_response. Yields one ("context", context_meta) event
+    once the context is gathered, then ("token", text) events as the LLM generates,
+    then a single ("done", full_text). Closing the generator early stops the
+    upstream LLM stream.
+    """
+    inputs, context_meta = build_hybrid_inputs(
+        user_query, mode, lat, lon, web_search=web_search, context_mode=context_mode,
+        filters=filters,
+    )
+    yield "context", context_meta
+
+    parts = []
+    with span("llm.hybrid", streaming=True) as llm_span:
+        usage = TokenUsage()
+        stream = build_hybrid_chain().stream(inputs, config={"callbacks": [usage]})
+        try:
+            for token in stream:
+                parts.append(token)
+                yield "token", token
+        finally:
+            stream.close()
+            usage.attach(llm_span, completion_text="".join(parts))
 
-    return result
\ No newline at end of file
+    yield "done", "".join(parts)
@@ -1,45 +1,40 @@
 # chains/rag_chain.py
-import os
+from functools import lru_cache
 from dotenv import load_dotenv
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from services.llm_client import get_llm
-from utils.data_utils import build_vectorstore_from_local_docs
+from services.retrieval_engine import get_retrieval_engine
+from config.constants import RAG_TOP_K, CONTEXT_CANDIDATES
+from utils.context_packer import pack_context, budget_for
+from utils.kb_catalog import pages_label
+from utils.tracing import span
+from utils.token_usage import TokenUsage
 
 # Load environment variables (ensures OpenAI/Groq API key is available)
 load_dotenv()
 
 def load_vectorstore():
-    """Loads or rebuilds the FAISS vectorstore from local documents."""
+    """
+    Returns the current index shards ({collection: FAISS store}), rebuilding them first
+    only if the knowledge base changed since the last build (.timestamp); the rebuild
+    publishes a new version atomically.
+    """
+    from utils.auto_rebuild import auto_rebuild_vectorstore
+
     try:
         print("🔍 Loading vectorstore from local data...")
-        return build_vectorstore_from_local_docs()
+        auto_rebuild_vectorstore()
+        return get_retrieval_engine().get_shards()
     except Exception as e:
         print(f"⚠️ Error loading vectorstore: {e}")
         raise
 
-def get_rag_response(query: str):
+@lru_cache(maxsize=None)
+def build_rag_chain(temperature: float = 0.3, max_tokens: int = 512):
     """
-    Retrieves a contextual answer from the local FAISS vector database.
-    Uses HuggingFace sentence transformer embeddings and Llama/Groq LLM.
+    Builds the RAG prompt | LLM chain once per LLM profile; it is stateless and safe to reuse.
     """
-
-    # --- 1️. Load FAISS vector store
-    vectorstore_path = os.path.join("data", "vectorstore")
-    if not os.path.exists(vectorstore_path):
-        return "[RAG Error] Vector store not found. Please run your data ingestion first."
-
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    db = FAISS.load_local(vectorstore_path, embeddings, allow_dangerous_deserialization=True)
-
-    # --- 2. Retrieve top relevant documents
-    retriever = db.as_retriever(search_type="similarity", search_kwargs={"k": 3})
-    docs = retriever._get_relevant_documents(query, run_manager=None)
-    context = "\n\n".join([d.page_content for d in docs]) if docs else "No relevant documents found."
-
-    # --- 3️. Prepare prompt for LLM
     prompt = PromptTemplate(
         input_variables=["context", "query"],
         template=(
@@ -49,12 +44,87 @@ def get_rag_response(query: str):
             "Provide a structured, concise, and fact-based answer based only on the context provided. Always do factcheck and groundness for avoiding hallucinations"
         ),
     )
+    return prompt | get_llm(temperature, max_tokens) | StrOutputParser()
+
+def chunks_from_docs(docs):
+    """Ranked chunk dicts for retrieved documents (see retrieve_chunks)."""
+    chunks = []
+    for rank, d in enumerate(docs, start=1):
+        meta = d.metadata
+        chunks.append({
+            "rank": rank,
+            "content": d.page_content,
+            "source": meta.get("source", "unknown"),
+            "collection": meta.get("collection"),
+            "year": meta.get("year"),
+            "pages": pages_label(meta.get("page_start"), meta.get("page_end")),
+            "start_index": meta.get("start_index"),
+            "end_index": meta.get("end_index"),
+            "page_start": meta.get("page_start"),
+            "page_end": meta.get("page_end"),
+        })
+    return chunks
+
+def retrieve_chunks(query: str, k: int = RAG_TOP_K, filters: dict = None):
+    """
+    Retrieval-only API: the ranked chunks for the query, without any LLM call.
+    `filters` ({"collection", "source", "year"}) limits the search to matching shards/files.
+    Returns a list of {"rank", "content", "source", "collection", "year", "pages", ...} dicts
+    ([] if no vectorstore exists); pages is "12" or "12-13" for PDF text, else None.
+    """
+    with span("retrieval.search", k=k, filtered=bool(filters)) as s:
+        docs = get_retrieval_engine().search(query, k=k, filters=filters)
+        s.set(hits=len(docs))
+    return chunks_from_docs(docs)
+
+def pack_chunks(query: str, chunks, mode: str = "detailed"):
+    """Packs retrieved chunks into the token budget of `mode`; returns (passages, stats)."""
+    with span("context.pack", mode=mode) as s:
+        packed, stats = pack_context(query, chunks, budget_for(mode))
+        s.set(tokens=stats["tokens"], budget=stats["budget"], passages=stats["passages"])
+    return packed, stats
+
+def retrieve_context(query: str, mode: str = "detailed", filters: dict = None):
+    """
+    Retrieves CONTEXT_CANDIDATES chunks and packs them (overlaps merged, near-duplicates
+    dropped) into the token budget of the response mode. Returns (passages, stats).
+    """
+    return pack_chunks(query, retrieve_chunks(query, k=CONTEXT_CANDIDATES, filters=filters), mode)
+
+def format_chunks(chunks) -> str:
+    """Numbered, source-labelled excerpts for direct insertion into a prompt."""
+    if not chunks:
+        return "No relevant documents found."
+
+    def label(c):
+        return f"{c['source']}, p. {c['pages']}" if c.get("pages") else c["source"]
+
+    return "\n\n".join(f"[{c['rank']}] ({label(c)})\n{c['content']}" for c in chunks)
+
+def get_rag_response(query: str, mode: str = "detailed", filters: dict = None):
+    """
+    Retrieves a contextual answer from the local FAISS vector database.
+    Uses the resident retrieval engine (embeddings + index loaded once) and Llama/Groq LLM.
+    The retrieved chunks are packed into the token budget of `mode`; `filters` limits
+    retrieval as in retrieve_chunks.
+    """
+
+    # --- 1️. Use the resident FAISS vector store
+    engine = get_retrieval_engine()
+    if not engine.get_shards():
+        return "[RAG Error] Vector store not found. Please run your data ingestion first."
 
-    llm = get_llm()
-    chain = prompt | llm | StrOutputParser()
+    # --- 2. Retrieve top relevant documents and pack them into the budget
+    passages, _ = retrieve_context(query, mode, filters)
+    context = "\n\n".join(p["content"] for p in passages) if passages else "No relevant documents found."
 
-    # --- 4️. Run and return response
+    # --- 3️. Run the cached prompt | LLM chain and return response
     try:
-        return chain.invoke({"context": context, "query": query})
+        with span("llm.rag") as llm_span:
+            usage = TokenUsage()
+            answer = build_rag_chain().invoke({"context": context, "query": query},
+                                              config={"callbacks": [usage]})
+            usage.attach(llm_span)
+        return answer
     except Exception as e:
-        return f"[RAG Error] {e}"
\ No newline at end of file
+        return f"[RAG Error] {e}"
@@ -1,33 +1,70 @@
 # chains/weather_chain.py
 import requests
+from utils import http_client
 from config.config import OPEN_METEO_BASE, DEFAULT_LAT, DEFAULT_LON
+from config.constants import WEATHER_CURRENT_REFRESH
+from utils.weather_cache import weather_cache
+from utils.tracing import span
 
-def get_weather_data(user_query: str) -> str:
+WEATHER_KEYWORDS = ["weather", "rain", "temperature", "humidity", "climate", "forecast"]
+
+
+def needs_weather(user_query: str) -> bool:
+    """True if the query asks about conditions that live weather data can inform."""
+    query = user_query.lower()
+    return any(word in query for word in WEATHER_KEYWORDS)
+
+
+def _fetch_current(lat: float, lon: float) -> dict:
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "current": "temperature_2m,precipitation,wind_speed_10m",
+    }
+    with span("weather.fetch"):
+        response = http_client.get(OPEN_METEO_BASE, params=params)
+        response.raise_for_status()
+        return response.json()
+
+
+def get_current_weather(lat: float, lon: float):
     """
-    Extracts current weather or forecast data based on default coordinates
-    (or optionally extended later for geocoding).
+    Current conditions for the forecast grid cell containing (lat, lon), shared through
+    the weather cache. Returns (data, expires_at).
     """
-    try:
-        # For now, static location (Chennai)
-        lat, lon = DEFAULT_LAT, DEFAULT_LON
-        url = f"{OPEN_METEO_BASE}?latitude={lat}&longitude={lon}&current=temperature_2m,precipitation,wind_speed_10m"
-        response = requests.get(url, timeout=10)
-
-        if response.status_code != 200:
-            return f"Weather API returned status {response.status_code}"
-
-        data = response.json()
-        current = data.get("current", {})
-        temperature = current.get("temperature_2m", "N/A")
-        precipitation = current.get("precipitation", "N/A")
-        wind_speed = current.get("wind_speed_10m", "N/A")
-
-        return (
-            f"Current weather conditions (Bengaluru):\n"
-            f"• Temperature: {temperature} °C\n"
-            f"• Precipitation: {precipitation} mm\n"
-            f"• Wind Speed: {wind_speed} m/s\n"
-        )
+    return weather_cache.get_or_fetch("current", lat, lon, WEATHER_CURRENT_REFRESH, _fetch_current)
+
 
+def fetch_weather_context(user_query: str, lat: float = DEFAULT_LAT, lon: float = DEFAULT_LON) -> str:
+    """
+    Current weather conditions for the given coordinates as prompt context.
+    Errors (HTTP status, network, deadline) propagate, so context stages report
+    them as failed instead of passing an error message to the LLM.
+    """
+    data, _ = get_current_weather(lat, lon)
+    current = data.get("current", {})
+    temperature = current.get("temperature_2m", "N/A")
+    precipitation = current.get("precipitation", "N/A")
+    wind_speed = current.get("wind_speed_10m", "N/A")
+
+    return (
+        f"Current weather conditions (lat {lat:.2f}, lon {lon:.2f}):\n"
+        f"• Temperature: {temperature} °C\n"
+        f"• Precipitation: {precipitation} mm\n"
+        f"• Wind Speed: {wind_speed} m/s\n"
+    )
+
+
+def get_weather_data(user_query: str, lat: float = DEFAULT_LAT, lon: float = DEFAULT_LON) -> str:
+    """
+    Extracts current weather conditions for the given coordinates
+    (the sidebar location; defaults to DEFAULT_LAT/DEFAULT_LON).
+    Errors are returned as a message for display; prompt context should use
+    fetch_weather_context, which raises instead.
+    """
+    try:
+        return fetch_weather_context(user_query, lat, lon)
+    except requests.HTTPError as e:
+        return f"Weather API returned status {e.response.status_code}"
     except Exception as e:
-        return f"[Weather API Error] {str(e)}"
\ No newline at end of file
+        return f"[Weather API Error] {str(e)}"
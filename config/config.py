@@ -18,11 +18,14 @@ HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
 VECTORSTORE_PATH = os.getenv("VECTORSTORE_PATH", "data/vectorstore/faiss_index")
 
 # Weather
-OPEN_METEO_BASE = "https://api.open-meteo.com/v1/forecast"
+OPEN_METEO_BASE = os.getenv("OPEN_METEO_BASE", "https://api.open-meteo.com/v1/forecast")
 
 #Serper Google Search API Integration
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
 
+# Startup: warm the pipeline up in the background instead of blocking the first page
+FAST_START = os.getenv("FAST_START", "true").lower() in ("1", "true", "yes")
+
 # App defaults
 DEFAULT_LAT = float(os.getenv("DEFAULT_LAT", 13.0827))
 DEFAULT_LON = float(os.getenv("DEFAULT_LON", 80.2707))
\ No newline at end of file
@@ -2,7 +2,112 @@
 Global constants used across the project.
 """
 CHUNK_SIZE = 500          # characters per chunk for document chunking
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+KB_CHUNK_SIZE = 1000      # characters per chunk for the vectorstore
+KB_CHUNK_OVERLAP = 200    # characters shared by consecutive vectorstore chunks
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 FAISS_INDEX_DIR = "data/vectorstore"
 KNOWLEDGE_DIR = "data/knowledge_base"
-SAMPLE_OUTPUT_DIR = "data/samples"
\ No newline at end of file
+SAMPLE_OUTPUT_DIR = "data/samples"
+RAG_TOP_K = 3             # documents retrieved per query
+EMBEDDING_CACHE_DIR = "data/embedding_cache"
+EMBEDDING_CACHE_MAX_ENTRIES = 200_000   # vectors kept on disk per embedding model (LRU beyond that)
+
+# FAISS index type: "flat" (exact), "ivf", "hnsw" or "ivfpq" (see utils/faiss_index.py)
+FAISS_INDEX_TYPE = "flat"
+FAISS_IVF_NLIST = 4096        # upper bound on IVF cells (scaled down to ~4*sqrt(N) for small corpora)
+FAISS_IVF_NPROBE = 16         # IVF cells visited per query
+FAISS_HNSW_M = 32             # HNSW graph degree
+FAISS_HNSW_EF_SEARCH = 64     # HNSW search breadth
+FAISS_PQ_M = 16               # PQ sub-quantizers (must divide the embedding dimension)
+FAISS_MMAP = True             # open the index memory-mapped instead of reading it into RAM
+
+# Hybrid (BM25 + dense) retrieval, fused with reciprocal-rank fusion
+HYBRID_RETRIEVAL = True
+RAG_FETCH_K = 20              # candidates taken from each retriever before fusion
+RRF_K = 60                    # RRF damping constant
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Answer cache (exact + semantic) in front of the hybrid pipeline
+ANSWER_CACHE_MAX_ENTRIES = 2000
+ANSWER_CACHE_TTL = 6 * 3600       # seconds, answers built only from static knowledge
+ANSWER_CACHE_SIMILARITY = 0.92    # cosine similarity for a semantic hit
+ANSWER_CACHE_LOC_DECIMALS = 1     # lat/lon rounding for the cache key (~11 km)
+
+# Weather cache: requests are shared per forecast grid cell and refreshed on the
+# model update cadence (Open-Meteo "current" values every 15 min, forecasts hourly)
+WEATHER_GRID_RESOLUTION = 0.1     # degrees (~11 km)
+WEATHER_CURRENT_REFRESH = 15 * 60
+WEATHER_FORECAST_REFRESH = 60 * 60
+
+# Per-stage deadlines (seconds) for concurrent context gathering in hybrid_response
+CONTEXT_POOL_WORKERS = 16         # worker threads per context stage
+RETRIEVAL_STAGE_TIMEOUT = 5.0     # retrieval-only context (default)
+RAG_STAGE_TIMEOUT = 30.0          # two-stage context (includes an LLM call)
+WEATHER_STAGE_TIMEOUT = 4.0
+WEB_SEARCH_STAGE_TIMEOUT = 6.0
+
+# How hybrid_response builds its knowledge context:
+#   "retrieval": ranked chunks go straight into the hybrid prompt (one LLM call)
+#   "two_stage": a RAG LLM answer is generated first and fed to the hybrid prompt
+HYBRID_CONTEXT_MODE = "retrieval"
+
+# Shared pooled HTTP client (utils/http_client.py)
+HTTP_CONNECT_TIMEOUT = 3.05   # seconds
+HTTP_READ_TIMEOUT = 10.0      # seconds
+HTTP_MAX_RETRIES = 2
+HTTP_BACKOFF_FACTOR = 0.3     # retry sleeps: 0.3 s, 0.6 s, ... plus jitter
+HTTP_BACKOFF_JITTER = 0.3
+HTTP_POOL_CONNECTIONS = 8     # distinct hosts kept in the pool
+HTTP_POOL_MAXSIZE = 32        # keep-alive connections per host
+
+# Shared LLM connection pool (services/llm_client.py)
+LLM_POOL_MAX_CONNECTIONS = 32
+LLM_POOL_MAX_KEEPALIVE = 16
+LLM_KEEPALIVE_EXPIRY = 60.0   # seconds an idle connection to the Groq endpoint is kept
+LLM_CONNECT_TIMEOUT = 5.0
+LLM_READ_TIMEOUT = 60.0
+LLM_MAX_RETRIES = 2
+
+# Bulk answering (services/genai_service.answer_many)
+BATCH_LLM_CONCURRENCY = 8     # LLM calls in flight at once
+
+# Request tracing (utils/tracing.py)
+TRACE_DIR = "data/traces"
+TRACE_SLOW_MS = 8000          # traces at least this slow are always stored
+TRACE_SAMPLE_RATE = 0.05      # fraction of the remaining traces that is stored
+TRACE_STORE_MAX_BYTES = 20 * 1024 * 1024   # traces.jsonl is rotated to traces.jsonl.1 beyond this
+TRACE_METRICS_INTERVAL = 15.0 # seconds between rewrites of the Prometheus metrics file
+TRACE_HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Feedback database (utils/feedback_db.py)
+FEEDBACK_BATCH_SIZE = 256       # rows committed per write transaction
+FEEDBACK_FLUSH_INTERVAL = 0.2   # seconds the writer waits for more rows before committing
+FEEDBACK_QUEUE_MAX = 10_000     # queued rows before store_feedback_db applies back-pressure
+SQLITE_BUSY_TIMEOUT = 5.0       # seconds to wait for a locked database
+
+# Vectorstore versions (utils/vectorstore_versions.py)
+VECTORSTORE_KEEP_VERSIONS = 3   # published versions kept on disk, including the current one
+
+# Synthetic map rendering (utils/map_renderer.py)
+MAP_CACHE_SIZE = 64             # encoded PNGs kept per (location, size)
+MAP_LOC_DECIMALS = 2            # coordinates are rounded to this many decimals for the seed and cache key
+
+# Gridded live weather (utils/weather_grid.py)
+WEATHER_GRID_EXTENT = 0.8         # degrees on each side of the selected point
+WEATHER_GRID_BATCH = 400          # locations per Open-Meteo request (keeps the URL under ~8 KB)
+WEATHER_GRID_VARIABLES = {"temperature_2m": "°C", "precipitation": "mm"}   # layer -> units
+
+# Streaming ingestion (utils/data_utils.py)
+INGEST_READ_SIZE = 1 << 20        # characters read from a knowledge-base file at a time
+EMBED_BATCH_SIZE = 512            # chunks embedded and added to the index per batch (IVF/PQ train on the first)
+
+# Context packing (utils/context_packer.py): retrieved chunks are merged, de-duplicated
+# and packed into a per-mode token budget before they go into the prompt
+CONTEXT_CANDIDATES = 8            # chunks retrieved as packing candidates
+CONTEXT_TOKEN_BUDGETS = {"concise": 600, "detailed": 1500}
+CONTEXT_MMR_LAMBDA = 0.7          # relevance vs. novelty trade-off of the MMR selection
+CONTEXT_RANK_WEIGHT = 0.7         # share of the fused retrieval rank (vs. dense cosine) in MMR relevance
+CONTEXT_DUP_SIMILARITY = 0.95     # cosine similarity above which a passage counts as a duplicate
+CONTEXT_PASSAGE_OVERHEAD = 12     # tokens for the numbered source label of each passage
+CHARS_PER_TOKEN = 4               # token estimate when no tokenizer is involved
@@ -1,4 +1,5 @@
-import requests, os
+import os
+from utils import http_client
 
 urls = {
     "icar_naarm_climate_agri.pdf": "https://naarm.org.in/wp-content/uploads/2020/06/ICAR-NAARM-Policy-on-Climate-Change-and-Agriculture_compressed.pdf",
@@ -14,8 +15,13 @@ os.makedirs("data/knowledge_base", exist_ok=True)
 
 for name, url in urls.items():
     print(f"Downloading {name}...")
-    r = requests.get(url, timeout=60)
-    r.raise_for_status()
-    with open(os.path.join("data/knowledge_base", name), "wb") as f:
-        f.write(r.content)
-print("✅ All files downloaded successfully!")
\ No newline at end of file
+    # Stream to disk through the shared pooled client (long read timeout for large reports)
+    with http_client.get(url, stream=True, timeout=(10, 60)) as r:
+        r.raise_for_status()
+        # iter_content applies Content-Encoding (gzip/deflate); r.raw would not
+        with open(os.path.join("data/knowledge_base", name), "wb") as f:
+            for block in r.iter_content(1 << 20):
+                f.write(block)
+print("✅ All files downloaded successfully!")
+for host, stats in http_client.get_http_stats().items():
+    print(f"   {host}: {stats}")
\ No newline at end of file
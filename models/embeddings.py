@@ -1,8 +1,20 @@
 """
 Embeddings wrapper using HuggingFace / SentenceTransformers via LangChain.
 """
-from langchain.embeddings import HuggingFaceEmbeddings
+from functools import lru_cache
+
 from config.constants import EMBEDDING_MODEL
+from utils.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+@lru_cache(maxsize=None)
+def get_embeddings(model_name: str = EMBEDDING_MODEL):
+    """
+    Returns a process-wide embeddings instance (the model is loaded only once).
+    Vectors are served from the persistent on-disk embedding cache when available,
+    for both document ingestion and query embedding.
+    The model stack (torch / sentence-transformers) is imported on first use.
+    """
+    from langchain_huggingface import HuggingFaceEmbeddings
 
-def get_embeddings():
-    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
\ No newline at end of file
+    return CachedEmbeddings(HuggingFaceEmbeddings(model_name=model_name), EmbeddingCache(model_name))
@@ -2,29 +2,129 @@
 """
 Batch converts all PDFs inside data/knowledge_base/ into clean text files.
 Generates .txt versions for RAG embedding later.
+
+Work is split across processes by file and by page range: every task extracts a
+slice of pages straight into a part file, and the parts are concatenated into the
+final .txt once all slices of a PDF are done. Pages are separated by a form feed
+(\\f) so page numbers stay recoverable downstream. PDFs whose .txt is already newer
+than the source are skipped unless --force is given.
+
+Usage:
+    python pdf_to_text_batch.py [--kb-dir data/knowledge_base] [--workers N]
+                                [--pages-per-task 25] [--force]
 """
 
 import os
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import fitz  # PyMuPDF
 
-# Folder path
-kb_folder = "data/knowledge_base"
+PAGE_SEPARATOR = "\f"
+
+
+def _is_up_to_date(pdf_path: str, txt_path: str) -> bool:
+    return os.path.exists(txt_path) and os.path.getmtime(txt_path) >= os.path.getmtime(pdf_path)
+
+
+def _extract_pages(pdf_path: str, start: int, stop: int, part_path: str) -> int:
+    """Writes pages [start, stop) of the PDF to part_path, one page at a time."""
+    with fitz.open(pdf_path) as pdf, open(part_path, "w", encoding="utf-8") as out:
+        for page_no in range(start, stop):
+            out.write(pdf[page_no].get_text("text"))
+            out.write(PAGE_SEPARATOR)
+    return stop - start
 
-# Create folder if not exist
-os.makedirs(kb_folder, exist_ok=True)
 
-for filename in os.listdir(kb_folder):
-    if filename.lower().endswith(".pdf"):
+def _merge_parts(part_paths, txt_path: str):
+    """Streams the part files into the final .txt and swaps it in atomically."""
+    tmp_path = txt_path + ".part"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        for part_path in part_paths:
+            with open(part_path, "r", encoding="utf-8") as part:
+                shutil.copyfileobj(part, out)
+            os.remove(part_path)
+    os.replace(tmp_path, txt_path)
+
+
+def convert_all(kb_folder: str = "data/knowledge_base", workers: int = None,
+                pages_per_task: int = 25, force: bool = False):
+    """
+    Converts every outdated PDF in kb_folder. A PDF that fails is logged and skipped
+    (its .txt is left as it was); returns the names of the failed files.
+    """
+    os.makedirs(kb_folder, exist_ok=True)
+
+    # --- 1. Plan: which PDFs need converting and how their pages are sliced
+    jobs, failed = {}, []
+    for filename in sorted(os.listdir(kb_folder)):
+        if not filename.lower().endswith(".pdf"):
+            continue
         pdf_path = os.path.join(kb_folder, filename)
         txt_path = os.path.splitext(pdf_path)[0] + ".txt"
+        if not force and _is_up_to_date(pdf_path, txt_path):
+            print(f"Skipping (up to date): {filename}")
+            continue
+        try:
+            with fitz.open(pdf_path) as pdf:
+                page_count = pdf.page_count
+        except Exception as e:
+            print(f"❌ Skipping unreadable PDF {filename}: {e}")
+            failed.append(filename)
+            continue
+        ranges = [(s, min(s + pages_per_task, page_count)) for s in range(0, page_count, pages_per_task)]
+        jobs[pdf_path] = {"txt_path": txt_path, "ranges": ranges, "pending": len(ranges)}
+
+    if not jobs:
+        if not failed:
+            print("\n✅ All PDF files are already converted.")
+        return failed
+
+    # --- 2. Extract page slices in parallel, merging each PDF as soon as it completes
+    with tempfile.TemporaryDirectory(dir=kb_folder, prefix=".pdf_parts_") as parts_dir, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for n, (pdf_path, job) in enumerate(jobs.items()):
+            job["parts"] = []
+            for start, stop in job["ranges"]:
+                part_path = os.path.join(parts_dir, f"{n:05d}_{start:07d}.txt")
+                job["parts"].append(part_path)
+                futures[pool.submit(_extract_pages, pdf_path, start, stop, part_path)] = pdf_path
+            if not job["ranges"]:
+                _merge_parts([], job["txt_path"])
+
+        for future in as_completed(futures):
+            pdf_path = futures[future]
+            job = jobs[pdf_path]
+            job["pending"] -= 1
+            try:
+                future.result()
+            except Exception as e:
+                # One corrupt PDF must not stop the rest; its .txt is left untouched
+                if not job.get("error"):
+                    job["error"] = str(e)
+                    failed.append(os.path.basename(pdf_path))
+                    print(f"❌ Failed to convert {os.path.basename(pdf_path)}: {e}")
+                continue
+            if job["pending"] == 0 and not job.get("error"):
+                _merge_parts(job["parts"], job["txt_path"])
+                print(f"Converted: {os.path.basename(pdf_path)} -> {os.path.basename(job['txt_path'])}"
+                      f" ({job['ranges'][-1][1]} pages)")
 
-        print(f"Converting: {filename} -> {os.path.basename(txt_path)}")
-        text = ""
-        with fitz.open(pdf_path) as pdf:
-            for page in pdf:
-                text += page.get_text("text")
+    if failed:
+        print(f"\n⚠️ Converted the other PDFs; {len(failed)} failed: {', '.join(failed)}")
+    else:
+        print("\n✅ All PDF files converted to .txt successfully!")
+    return failed
 
-        with open(txt_path, "w", encoding="utf-8") as f:
-            f.write(text)
 
-print("\n✅ All PDF files converted to .txt successfully!")
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert knowledge-base PDFs to text in parallel.")
+    parser.add_argument("--kb-dir", default="data/knowledge_base")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--pages-per-task", type=int, default=25)
+    parser.add_argument("--force", action="store_true", help="re-extract even if the .txt is newer")
+    args = parser.parse_args()
+    convert_all(args.kb_dir, args.workers, args.pages_per_task, args.force)
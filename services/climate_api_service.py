@@ -2,6 +2,7 @@
 Service layer for climate APIs. Uses utils/data_utils under the hood.
 """
 from utils.data_utils import get_realtime_weather, get_realtime_weather_summary
+from utils.weather_grid import get_weather_grid
 from utils.logger import get_logger
 
 logger = get_logger("climate_api_service")
@@ -18,4 +19,11 @@ def fetch_weather_summary(lat: float, lon: float):
         return get_realtime_weather_summary(lat, lon)
     except Exception as e:
         logger.error("Failed to build weather summary: %s", e)
-        return "Weather summary unavailable."
\ No newline at end of file
+        return "Weather summary unavailable."
+
+def fetch_weather_grid(lat: float, lon: float, variable: str = "temperature_2m"):
+    try:
+        return get_weather_grid(lat, lon, variable)
+    except Exception as e:
+        logger.error("Failed to fetch weather grid: %s", e)
+        return None
@@ -3,41 +3,298 @@ Top-level service that orchestrates RAG + real-time + LLM hybrid reasoning.
 This is the unified interface used by the Streamlit frontend.
 """
 
-from chains.hybrid_chain import hybrid_response
-from utils.response_modes import format_response
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from chains.hybrid_chain import (
+    hybrid_response, hybrid_stream, build_hybrid_chain, make_hybrid_inputs, run_stages, stage_text,
+)
+from chains.rag_chain import format_chunks, chunks_from_docs, pack_chunks
+from chains.weather_chain import fetch_weather_context, needs_weather
+from config.config import DEFAULT_LAT, DEFAULT_LON
+from config.constants import BATCH_LLM_CONCURRENCY, CONTEXT_CANDIDATES, WEATHER_STAGE_TIMEOUT
+from services.retrieval_engine import get_retrieval_engine
+from models.embeddings import get_embeddings
+from utils.answer_cache import get_answer_cache
+from utils.response_modes import format_response, CONCISE_MAX_CHARS
 from utils.logger import get_logger
+from utils.tracing import start_trace, span
+from utils.token_usage import TokenUsage
 
 logger = get_logger("genai_service")
 
 
-def answer_query(user_query: str, lat: float, lon: float, mode: str = "concise"):
+def _build_meta(mode, includes_weather, cache, cache_level, context_meta):
+    return {
+        "source": "Hybrid (RAG + Real-time Weather)",
+        "query_mode": mode,
+        "includes_weather": includes_weather,
+        "cache": {"hit": cache_level or "miss", **cache.stats()},
+        "context": context_meta,
+        # Knowledge context tokens vs. the mode's budget (None on cache hits / two-stage)
+        "context_tokens": (context_meta or {}).get("context_tokens"),
+    }
+
+
+def answer_query(user_query: str, lat: float, lon: float, mode: str = "concise",
+                 web_search: bool = False, filters: dict = None):
     """
     Handles the entire reasoning pipeline:
+    - Serves repeated questions from the exact / semantic answer cache
     - Uses RAG (vectorstore knowledge)
-    - Integrates live weather data when relevant
+    - Integrates live weather data when relevant (and live web results if requested),
+      gathered concurrently with per-stage deadlines
     - Generates an LLM-based contextual response
+    `filters` ({"collection", "source", "year"}, see utils/kb_catalog.matches) limits the
+    knowledge context to matching documents. Every stage is traced; the spans are
+    returned in meta["trace"].
     """
 
+    trace = None
     try:
-        # ✅ Step 1 — Get hybrid reasoning output (internally merges RAG + Weather)
-        raw_answer = hybrid_response(user_query, mode=mode)
+        with start_trace("answer_query", mode=mode, web_search=web_search) as trace:
+            cache = get_answer_cache()
+            includes_weather = needs_weather(user_query)
+            embed_query = get_embeddings().embed_query
+
+            # ✅ Step 1 — Reuse a cached answer, or get hybrid reasoning output (RAG + Weather)
+            # Web results are time-sensitive and filtered answers are scoped to their
+            # documents, so those answers bypass the cache.
+            use_cache = not web_search and not filters
+            raw_answer, cache_level, context_meta = None, None, None
+            if use_cache:
+                with span("answer_cache.get") as s:
+                    raw_answer, cache_level = cache.get(user_query, mode, lat, lon, embed_query=embed_query)
+                    s.set(hit=cache_level or "miss")
+            if raw_answer is None:
+                raw_answer, context_meta = hybrid_response(
+                    user_query, mode=mode, lat=lat, lon=lon, web_search=web_search, filters=filters
+                )
+                # An answer built without a source (e.g. a weather API error) is not cached
+                degraded = context_meta["timed_out"] or context_meta["failed"]
+                if use_cache and not degraded:
+                    with span("answer_cache.put"):
+                        cache.put(user_query, mode, lat, lon, raw_answer,
+                                  uses_weather=includes_weather, embed_query=embed_query)
 
-        # ✅ Step 2 — Format the response for display (concise or detailed)
-        formatted_answer = format_response(raw_answer, mode=mode)
+            # ✅ Step 2 — Format the response for display (concise or detailed)
+            with span("format_response"):
+                formatted_answer = format_response(raw_answer, mode=mode)
 
         # ✅ Step 3 — Add metadata (for Streamlit dashboard insights)
-        meta = {
-            "source": "Hybrid (RAG + Real-time Weather)",
-            "query_mode": mode,
-            "includes_weather": any(
-                k in user_query.lower()
-                for k in ["weather", "rain", "temperature", "climate", "forecast"]
-            ),
-        }
+        meta = _build_meta(mode, includes_weather, cache, cache_level, context_meta)
+        meta["trace"] = trace.to_dict()
 
         return formatted_answer, meta
 
     except Exception as e:
         logger.error("❌ Hybrid chain failed: %s", e)
         error_msg = "⚠️ Sorry — an internal error occurred while generating your answer."
-        return error_msg, {"error": str(e), "status": "failed"}
\ No newline at end of file
+        meta = {"error": str(e), "status": "failed"}
+        if trace is not None:
+            meta["trace"] = trace.to_dict()
+        return error_msg, meta
+
+
+def answer_query_stream(user_query: str, lat: float, lon: float, mode: str = "concise",
+                        web_search: bool = False, filters: dict = None):
+    """
+    Streaming variant of answer_query for the chat UI.
+    Yields ("token", text) events while the answer is generated, then one final
+    ("meta", meta) event whose meta["answer"] holds the formatted answer.
+    Cached answers are emitted as a single token. In concise mode generation is
+    stopped as soon as enough text exists for the concise answer.
+    The trace (meta["trace"]) also records the time to the first token.
+    """
+    trace = None
+    try:
+        with start_trace("answer_query_stream", mode=mode, web_search=web_search) as trace:
+            cache = get_answer_cache()
+            includes_weather = needs_weather(user_query)
+            embed_query = get_embeddings().embed_query
+
+            use_cache = not web_search and not filters
+            raw_answer, cache_level, context_meta = None, None, None
+            if use_cache:
+                with span("answer_cache.get") as s:
+                    raw_answer, cache_level = cache.get(user_query, mode, lat, lon, embed_query=embed_query)
+                    s.set(hit=cache_level or "miss")
+
+            if raw_answer is not None:
+                yield "token", raw_answer
+            else:
+                parts, length = [], 0
+                events = hybrid_stream(user_query, mode=mode, lat=lat, lon=lon, web_search=web_search,
+                                       filters=filters)
+                for kind, payload in events:
+                    if kind == "context":
+                        context_meta = payload
+                        continue
+                    if kind == "done":
+                        break
+                    if not parts:
+                        trace.attrs["first_token_ms"] = trace.elapsed_ms()
+                    parts.append(payload)
+                    length += len(payload)
+                    yield "token", payload
+                    if mode == "concise" and length > CONCISE_MAX_CHARS:
+                        # The rest would be cut by format_response anyway
+                        events.close()
+                        break
+                raw_answer = "".join(parts)
+
+                degraded = context_meta is not None and (context_meta["timed_out"] or context_meta["failed"])
+                if use_cache and not degraded:
+                    with span("answer_cache.put"):
+                        cache.put(user_query, mode, lat, lon, raw_answer,
+                                  uses_weather=includes_weather, embed_query=embed_query)
+
+            with span("format_response"):
+                formatted_answer = format_response(raw_answer, mode=mode)
+
+        meta = _build_meta(mode, includes_weather, cache, cache_level, context_meta)
+        meta["answer"] = formatted_answer
+        meta["trace"] = trace.to_dict()
+        yield "meta", meta
+
+    except Exception as e:
+        logger.error("❌ Hybrid stream failed: %s", e)
+        meta = {
+            "answer": "⚠️ Sorry — an internal error occurred while generating your answer.",
+            "error": str(e),
+            "status": "failed",
+        }
+        if trace is not None:
+            meta["trace"] = trace.to_dict()
+        yield "meta", meta
+
+
+def answer_many(queries, lat: float = DEFAULT_LAT, lon: float = DEFAULT_LON, mode: str = "concise",
+                concurrency: int = BATCH_LLM_CONCURRENCY, filters: dict = None):
+    """
+    Bulk answer API for batch workloads (e.g. nightly advisories).
+
+    `queries` is an iterable of question strings or dicts with "query" (or "question")
+    and optional "id", "lat", "lon", "mode", "filters". All questions are embedded in one
+    batch and retrieved with one vectorized search per distinct `filters` (see
+    utils/kb_catalog.matches), weather is fetched once per grid cell, and at most
+    `concurrency` LLM calls run at a time. A question repeated with the same mode,
+    location and filters is answered once. Filtered questions, and answers whose weather
+    stage failed or timed out, bypass the answer cache.
+
+    Yields one dict per question in completion order:
+      {"id", "query", "answer", "meta"} on success, {"id", "query", "error"} on failure.
+    """
+    items = []
+    for n, q in enumerate(queries):
+        if isinstance(q, str):
+            q = {"query": q}
+        items.append({
+            "id": q.get("id", n),
+            "query": q.get("query") or q.get("question") or "",
+            "lat": float(q.get("lat", lat)),
+            "lon": float(q.get("lon", lon)),
+            "mode": q.get("mode", mode),
+            "filters": q.get("filters", filters),
+        })
+    if not items:
+        return
+
+    cache = get_answer_cache()
+    chain = build_hybrid_chain()
+
+    # --- 1. Exact-match cache hits are answered immediately; a question repeated with the
+    # same mode, location and filters is answered once and its result shared
+    pending, seen = [], {}
+    for item in items:
+        cached = None
+        if not item["filters"]:
+            cached, _ = cache.get(item["query"], item["mode"], item["lat"], item["lon"])
+        if cached is None:
+            key = (item["query"], item["mode"], item["lat"], item["lon"],
+                   json.dumps(item["filters"], sort_keys=True))
+            if key in seen:
+                seen[key]["copies"].append(item)
+            else:
+                item["copies"] = []
+                seen[key] = item
+                pending.append(item)
+        else:
+            yield {"id": item["id"], "query": item["query"],
+                   "answer": format_response(cached, mode=item["mode"]),
+                   "meta": {"query_mode": item["mode"], "cache": {"hit": "exact"}}}
+
+    # --- 2. One batched embedding + vectorized retrieval per filter for everything else
+    chunk_lists = [[] for _ in pending]
+    groups = {}
+    for n, item in enumerate(pending):
+        groups.setdefault(json.dumps(item["filters"], sort_keys=True), []).append(n)
+    for members in groups.values():
+        try:
+            docs_per_query = get_retrieval_engine().search_many(
+                [pending[n]["query"] for n in members], k=CONTEXT_CANDIDATES,
+                filters=pending[members[0]]["filters"],
+            )
+            for n, docs in zip(members, docs_per_query):
+                chunk_lists[n] = chunks_from_docs(docs)
+        except Exception as e:
+            for n in members:
+                pending[n]["retrieval_error"] = str(e)
+            logger.error("❌ Batch retrieval failed: %s", e)
+
+    def _answer(item, chunks):
+        with start_trace("answer_many", mode=item["mode"]) as trace:
+            chunks, pack_stats = pack_chunks(item["query"], chunks, item["mode"])
+            includes_weather = needs_weather(item["query"])
+            status = {"timed_out": [], "failed": []}
+            if includes_weather:
+                # Same deadline-bounded stage as gather_context
+                contexts, status = run_stages({"weather": (
+                    fetch_weather_context, (item["query"], item["lat"], item["lon"]),
+                    WEATHER_STAGE_TIMEOUT,
+                )})
+                weather = stage_text(contexts, status, "weather", "Weather data unavailable.")
+            else:
+                weather = "Weather data not relevant for this query."
+            inputs = make_hybrid_inputs(item["query"], item["mode"], format_chunks(chunks), weather)
+            with span("llm.hybrid") as llm_span:
+                usage = TokenUsage()
+                raw_answer = chain.invoke(inputs, config={"callbacks": [usage]})
+                usage.attach(llm_span)
+            # Answers built without knowledge or weather context (or scoped by filters)
+            # must not serve later users
+            degraded = status["timed_out"] or status["failed"]
+            if not item.get("retrieval_error") and not degraded and not item["filters"]:
+                cache.put(item["query"], item["mode"], item["lat"], item["lon"], raw_answer,
+                          uses_weather=includes_weather)
+        return raw_answer, includes_weather, chunks, pack_stats, status, trace.to_dict()
+
+    # --- 3. Bounded-concurrency LLM calls, results streamed in completion order
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="answer") as pool:
+        futures = {pool.submit(_answer, item, chunks): (item, chunks)
+                   for item, chunks in zip(pending, chunk_lists)}
+        for future in as_completed(futures):
+            item, chunks = futures[future]
+            try:
+                raw_answer, includes_weather, chunks, pack_stats, status, trace = future.result()
+            except Exception as e:
+                logger.error("❌ Batch item %s failed: %s", item["id"], e)
+                for copy in [item] + item["copies"]:
+                    yield {"id": copy["id"], "query": copy["query"], "error": str(e)}
+                continue
+            meta = {
+                "query_mode": item["mode"],
+                "includes_weather": includes_weather,
+                "cache": {"hit": "miss"},
+                "sources": [{"rank": c["rank"], "source": c["source"], "pages": c.get("pages")}
+                            for c in chunks],
+                "context_tokens": pack_stats,
+                "timed_out": status["timed_out"],
+                "failed": status["failed"],
+                "trace": trace,
+            }
+            if item.get("retrieval_error"):
+                meta["retrieval_error"] = item["retrieval_error"]
+            answer = format_response(raw_answer, mode=item["mode"])
+            for copy in [item] + item["copies"]:
+                yield {"id": copy["id"], "query": copy["query"], "answer": answer, "meta": meta}
@@ -1,16 +1,57 @@
 # services/llm_client.py
-from langchain_openai import ChatOpenAI
+"""
+Single source of LLM clients for the whole app.
+One ChatOpenAI client exists per (model, temperature, max_tokens) profile, and all
+profiles share one pooled HTTP connection pool to the Groq / OpenAI-compatible endpoint.
+"""
+from functools import lru_cache
+
 from config.config import OPENAI_API_KEY, OPENAI_API_BASE, OPENAI_API_MODEL
+from config.constants import (
+    LLM_POOL_MAX_CONNECTIONS, LLM_POOL_MAX_KEEPALIVE, LLM_KEEPALIVE_EXPIRY,
+    LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT, LLM_MAX_RETRIES,
+)
+
+
+@lru_cache(maxsize=1)
+def _http_clients():
+    """Shared sync + async httpx clients (keep-alive pools) for every LLM profile."""
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+    return (
+        httpx.Client(limits=limits, timeout=timeout),
+        httpx.AsyncClient(limits=limits, timeout=timeout),
+    )
 
-def get_llm(temperature: float = 0.3):
+
+@lru_cache(maxsize=None)
+def get_llm(temperature: float = 0.3, max_tokens: int = 512, model: str = OPENAI_API_MODEL):
     """
-    Returns a ChatOpenAI-compatible client configured for Grok/xAI (GPT-OSS-20B).
+    Returns a ChatOpenAI-compatible client configured for Groq (OPENAI_API_BASE).
+    The client is created once per (model, temperature, max_tokens) profile and
+    shared process-wide over the pooled HTTP connections.
     """
+    if not OPENAI_API_KEY:
+        raise EnvironmentError("OPENAI_API_KEY not set in environment")
+    # Imported here: the OpenAI SDK is one of the slowest imports at startup
+    from langchain_openai import ChatOpenAI
+
+    http_client, http_async_client = _http_clients()
     llm = ChatOpenAI(
         api_key=OPENAI_API_KEY,
-        base_url=OPENAI_API_BASE,      # important for xAI API
-        model=OPENAI_API_MODEL,
+        base_url=OPENAI_API_BASE,      # important for Groq / OpenAI-compatible APIs
+        model=model,
         temperature=temperature,
-        max_tokens=512
+        max_tokens=max_tokens,
+        max_retries=LLM_MAX_RETRIES,
+        stream_usage=True,             # token counts for streamed answers (utils/tracing.py)
+        http_client=http_client,
+        http_async_client=http_async_client,
     )
-    return llm
\ No newline at end of file
+    return llm
@@ -0,0 +1,222 @@
+"""
+Process-wide retrieval engine.
+Keeps the embedding model and every index shard (one memory-mapped FAISS index plus
+BM25 index per knowledge-base collection) resident, so each query only pays for the
+search itself. A query embeds once, searches only the shards its filters select (and,
+within a shard, only the matching sources), and merges the per-shard candidates:
+dense hits by distance, lexical hits by BM25 score (with IDFs computed over all the
+searched shards, so scores are comparable), then one reciprocal-rank fusion pass.
+The shards are hot-reloaded when the CURRENT version pointer under data/vectorstore
+moves (or, for the legacy flat layout, when the index files change). Queries keep
+using the loaded version while a new one loads.
+"""
+import os
+import threading
+
+import numpy as np
+
+from config.constants import FAISS_INDEX_DIR, RAG_TOP_K, RAG_FETCH_K, HYBRID_RETRIEVAL
+from models.embeddings import get_embeddings
+from utils.bm25 import BM25Index, BM25_FILE, corpus_idf, reciprocal_rank_fusion
+from utils.faiss_index import load_store, search_params
+from utils.kb_catalog import matches
+from utils.logger import get_logger
+from utils.vectorstore_versions import current_dir, shard_dirs
+
+logger = get_logger("retrieval_engine")
+
+INDEX_FILES = ("index.faiss", "index.pkl")
+OPTIONAL_FILES = (BM25_FILE,)
+
+
+def _file_signature(directory: str):
+    """(mtime, size) of the shard's index files, or None if the shard is incomplete."""
+    signature = []
+    for name in INDEX_FILES:
+        try:
+            st = os.stat(os.path.join(directory, name))
+        except FileNotFoundError:
+            return None
+        signature.append((st.st_mtime_ns, st.st_size))
+    for name in OPTIONAL_FILES:
+        try:
+            st = os.stat(os.path.join(directory, name))
+            signature.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _load_shard(name: str, directory: str) -> dict:
+    """Loads one shard and indexes its positions by source file for filtered searches."""
+    db = load_store(directory, get_embeddings())
+    bm25 = BM25Index.load(directory)
+    source_of = {}
+    positions = {}
+    for position, doc_id in db.index_to_docstore_id.items():
+        doc = db.docstore.search(doc_id)
+        source = doc.metadata.get("source", "unknown") if hasattr(doc, "metadata") else "unknown"
+        source_of[doc_id] = source
+        positions.setdefault(source, []).append(position)
+    lexical = {}
+    if bm25 is not None:
+        for n, doc_id in enumerate(bm25.doc_ids):
+            lexical.setdefault(source_of.get(doc_id, "unknown"), []).append(n)
+    return {
+        "name": name,
+        "db": db,
+        "bm25": bm25,
+        "positions": {src: np.asarray(p, dtype=np.int64) for src, p in positions.items()},
+        "lexical": {src: np.asarray(p, dtype=np.int64) for src, p in lexical.items()},
+    }
+
+
+class RetrievalEngine:
+    """
+    Thread-safe holder for the loaded index shards, shared by all Streamlit sessions.
+    """
+
+    def __init__(self, vs_dir: str = FAISS_INDEX_DIR):
+        self.vs_dir = vs_dir
+        self._lock = threading.Lock()
+        self._shards = None          # {collection: shard dict}
+        self._signature = None
+
+    def _disk_signature(self):
+        """
+        (directory, (shard, file signature)...) for the current version, or None if
+        no index exists yet.
+        """
+        directory = current_dir(self.vs_dir)
+        signature = [directory]
+        for name, shard_dir in shard_dirs(directory).items():
+            files = _file_signature(shard_dir)
+            if files is not None:
+                signature.append((name, shard_dir, files))
+        return tuple(signature) if len(signature) > 1 else None
+
+    def _indexes(self) -> dict:
+        """
+        Returns {collection: shard}, (re)loading the shards only when the files on disk
+        changed. Empty if no vectorstore has been built yet.
+        """
+        signature = self._disk_signature()
+        if signature is None:
+            return self._shards or {}
+        if self._shards is not None and signature == self._signature:
+            return self._shards
+
+        # While one thread loads a new version, the others keep serving the loaded one
+        if not self._lock.acquire(blocking=self._shards is None):
+            return self._shards
+        try:
+            # Another thread may have reloaded while we waited for the lock
+            if self._shards is None or signature != self._signature:
+                logger.info("Loading %d index shard(s) from %s", len(signature) - 1, signature[0])
+                try:
+                    shards = {name: _load_shard(name, shard_dir) for name, shard_dir, _ in signature[1:]}
+                except Exception as e:
+                    if self._shards is None:
+                        raise
+                    # Keep serving the loaded version rather than failing queries
+                    logger.error("❌ Could not load %s (%s); keeping the loaded index", signature[0], e)
+                    self._signature = signature
+                    return self._shards
+                self._shards, self._signature = shards, signature
+            return self._shards
+        finally:
+            self._lock.release()
+
+    def get_shards(self) -> dict:
+        """Returns {collection: FAISS store} ({} if no vectorstore has been built yet)."""
+        return {name: shard["db"] for name, shard in self._indexes().items()}
+
+    def _plan(self, shards: dict, filters: dict = None):
+        """
+        The shards a filtered query must search, each with the index positions and BM25
+        documents it may return (None = the whole shard).
+        """
+        plan = []
+        for shard in shards.values():
+            # Collections map to shards, so non-matching shards drop out here unsearched
+            sources = [src for src in shard["positions"] if matches(src, filters)]
+            if not sources:
+                continue
+            if len(sources) == len(shard["positions"]):
+                plan.append((shard, None, None))
+                continue
+            positions = np.concatenate([shard["positions"][src] for src in sources])
+            allowed = None
+            if shard["bm25"] is not None:
+                allowed = np.zeros(len(shard["bm25"].doc_ids), dtype=bool)
+                for src in sources:
+                    allowed[shard["lexical"].get(src, [])] = True
+            plan.append((shard, positions, allowed))
+        return plan
+
+    def search(self, query: str, k: int = RAG_TOP_K, filters: dict = None):
+        """
+        Top-k documents for the query ([] if no index is available): dense and BM25
+        candidates fused with reciprocal-rank fusion, or dense-only without a BM25 index.
+        `filters` ({"collection", "source", "year"}, see utils/kb_catalog.matches)
+        restricts the search to the matching shards and files.
+        """
+        return self.search_many([query], k, filters)[0]
+
+    def search_many(self, queries, k: int = RAG_TOP_K, filters: dict = None):
+        """
+        Batch variant of search(): all queries are embedded in one batch and every
+        selected shard is searched with a single vectorized FAISS call.
+        Returns one document list per query.
+        """
+        queries = list(queries)
+        shards = self._indexes()
+        plan = self._plan(shards, filters)
+        if not plan or not queries:
+            return [[] for _ in queries]
+        hybrid = HYBRID_RETRIEVAL and all(shard["bm25"] is not None for shard, _, _ in plan)
+        fetch = RAG_FETCH_K if hybrid else k
+
+        vectors = np.asarray(get_embeddings().embed_queries(queries), dtype=np.float32)
+        dense = [[] for _ in queries]           # per query: (distance, doc_id, shard)
+        for shard, positions, _ in plan:
+            db = shard["db"]
+            distances, found = db.index.search(vectors, fetch, params=search_params(db.index, positions))
+            for hits, row_d, row_p in zip(dense, distances, found):
+                hits.extend((float(d), db.index_to_docstore_id[int(p)], shard)
+                            for d, p in zip(row_d, row_p) if p != -1)
+
+        results = []
+        for query, hits in zip(queries, dense):
+            hits.sort(key=lambda h: h[0])
+            owner = {doc_id: shard for _, doc_id, shard in hits}
+            ranked = [doc_id for _, doc_id, _ in hits[:fetch]]
+            if hybrid:
+                # Shards are scored with IDFs over all searched shards, so their BM25
+                # scores are comparable and can be merged before the single RRF pass
+                idf = corpus_idf([shard["bm25"] for shard, _, _ in plan], query) if len(plan) > 1 else None
+                lexical = []
+                for shard, _, allowed in plan:
+                    for doc_id, score in shard["bm25"].search(query, fetch, allowed, idf):
+                        lexical.append((score, doc_id))
+                        owner.setdefault(doc_id, shard)
+                lexical.sort(key=lambda h: -h[0])
+                ranked = reciprocal_rank_fusion(ranked, [doc_id for _, doc_id in lexical[:fetch]])
+            results.append([owner[doc_id]["db"].docstore.search(doc_id) for doc_id in ranked[:k]])
+        return results
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_retrieval_engine() -> RetrievalEngine:
+    """
+    Returns the process-wide retrieval engine (created on first use).
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RetrievalEngine()
+    return _engine
@@ -0,0 +1,83 @@
+"""
+Background warm-up for fast starts.
+
+The Streamlit app renders its first page without importing the answer pipeline.
+warm_up() then runs on a background thread. It starts the background knowledge-base
+check (a rebuild publishes a new vectorstore version when done), imports the pipeline
+modules, loads the embedding model and the current FAISS / BM25 indexes, and prepares
+the LLM client.
+The first question then finds everything resident, and the page never waited.
+"""
+import time
+import threading
+
+from utils.logger import get_logger
+
+logger = get_logger("warmup")
+
+_status = {"state": "idle", "steps": {}, "error": None}
+_status_lock = threading.Lock()
+_thread = None
+
+
+def _step(name, fn):
+    start = time.perf_counter()
+    try:
+        fn()
+    finally:
+        with _status_lock:
+            _status["steps"][name] = round(time.perf_counter() - start, 2)
+
+
+def _check_knowledge_base():
+    from utils.auto_rebuild import start_background_rebuild
+    start_background_rebuild()
+
+
+def _import_pipeline():
+    import services.genai_service  # noqa: F401
+
+
+def _load_indexes():
+    from services.retrieval_engine import get_retrieval_engine
+    get_retrieval_engine().get_shards()
+
+
+def _prepare_llm():
+    from chains.hybrid_chain import build_hybrid_chain
+    build_hybrid_chain()
+
+
+def warm_up():
+    """
+    Runs every warm-up step in order. Failures are logged and recorded in the
+    status; the pipeline then loads lazily on the first question as usual.
+    """
+    with _status_lock:
+        _status["state"] = "running"
+    for name, fn in (("knowledge_base", _check_knowledge_base), ("imports", _import_pipeline),
+                     ("indexes", _load_indexes), ("llm", _prepare_llm)):
+        try:
+            _step(name, fn)
+        except Exception as e:
+            logger.warning("⚠️ Warm-up step '%s' failed: %s", name, e)
+            with _status_lock:
+                _status["error"] = f"{name}: {e}"
+    with _status_lock:
+        _status["state"] = "done"
+    logger.info("✅ Warm-up finished: %s", _status["steps"])
+
+
+def start_warmup() -> threading.Thread:
+    """Starts warm_up() on a daemon thread once per process."""
+    global _thread
+    with _status_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def warmup_status() -> dict:
+    with _status_lock:
+        return {"state": _status["state"], "steps": dict(_status["steps"]), "error": _status["error"]}
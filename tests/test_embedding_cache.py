@@ -0,0 +1,63 @@
+"""
+Several processes (e.g. Streamlit workers and an ingestion job) share one on-disk
+embedding cache; every key must keep returning its own vector.
+"""
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from utils.embedding_cache import EmbeddingCache
+
+MODEL = "test/model"
+DIM = 8
+WRITES = 300
+
+
+def _vector(worker: int, n: int):
+    return np.full(DIM, worker * 100000 + n, dtype=np.float32)
+
+
+def _writer(cache_dir, max_entries, worker, start, errors):
+    cache = EmbeddingCache(MODEL, cache_dir=cache_dir, max_entries=max_entries)
+    start.wait()
+    for n in range(WRITES):
+        key = f"w{worker}-{n}"
+        cache.put_many([key], [_vector(worker, n)])
+        cached = cache.get_many([key])[0]
+        if cached is not None and not np.array_equal(cached, _vector(worker, n)):
+            errors.put(f"{key} read back another entry's vector")
+
+
+def _run_writers(cache_dir, max_entries, workers=2):
+    ctx = multiprocessing.get_context("spawn")
+    start, errors = ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=_writer, args=(cache_dir, max_entries, w, start, errors))
+             for w in range(workers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=120)
+        assert p.exitcode == 0
+    found = []
+    while not errors.empty():
+        found.append(errors.get())
+    return found
+
+
+@pytest.mark.parametrize("max_entries", [10000, 64])
+def test_two_processes_share_one_cache(tmp_path, max_entries):
+    assert _run_writers(str(tmp_path), max_entries) == []
+
+    cache = EmbeddingCache(MODEL, cache_dir=str(tmp_path), max_entries=max_entries)
+    keys = [(w, n) for w in range(2) for n in range(WRITES)]
+    vectors = cache.get_many([f"w{w}-{n}" for w, n in keys])
+    hits = 0
+    for (w, n), vector in zip(keys, vectors):
+        if vector is not None:
+            hits += 1
+            assert np.array_equal(vector, _vector(w, n)), f"w{w}-{n} maps to another entry's row"
+    if max_entries >= len(keys):
+        assert hits == len(keys)
+    else:
+        assert 0 < hits <= max_entries
@@ -0,0 +1,81 @@
+"""
+A weather API error must be reported as a failed context stage and must never
+end up in the answer cache (interactive, streamed and batch answers alike).
+"""
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.output_parsers import StrOutputParser
+
+from benchmarks.stubs import FakeOpenMeteo, fake_embeddings, fake_llm
+from chains import hybrid_chain, weather_chain
+from services import genai_service
+from utils.answer_cache import AnswerCache
+
+QUERY = "What is the temperature and rain outlook for my paddy field?"
+LAT, LON = 11.11, 77.77
+
+
+@pytest.fixture
+def failing_weather(monkeypatch):
+    with FakeOpenMeteo(status=500) as meteo:
+        monkeypatch.setattr(weather_chain, "OPEN_METEO_BASE", meteo.url)
+        yield meteo
+
+
+@pytest.fixture
+def offline_pipeline(monkeypatch):
+    monkeypatch.setattr(hybrid_chain, "retrieve_context", lambda *args: ([], {}))
+    chain = lambda *args, **kwargs: hybrid_chain.build_hybrid_prompt() | fake_llm() | StrOutputParser()
+    monkeypatch.setattr(hybrid_chain, "build_hybrid_chain", chain)
+    monkeypatch.setattr(genai_service, "build_hybrid_chain", chain)
+    monkeypatch.setattr(genai_service, "get_retrieval_engine",
+                        lambda: SimpleNamespace(search_many=lambda queries, **kw: [[] for _ in queries]))
+    embeddings = fake_embeddings()
+    monkeypatch.setattr(genai_service, "get_embeddings", lambda: embeddings)
+    cache = AnswerCache()
+    monkeypatch.setattr(genai_service, "get_answer_cache", lambda: cache)
+    return cache
+
+
+def test_weather_500_is_a_failed_stage(failing_weather, offline_pipeline):
+    contexts, meta = hybrid_chain.gather_context(QUERY, LAT, LON)
+
+    assert failing_weather.requests >= 1
+    assert "weather" in meta["failed"]
+    assert "weather" not in contexts
+
+
+def test_weather_500_answer_is_not_cached(failing_weather, offline_pipeline):
+    answer, meta = genai_service.answer_query(QUERY, LAT, LON, mode="detailed")
+
+    assert meta.get("status") != "failed"
+    assert "weather" in meta["context"]["failed"]
+    assert offline_pipeline.get(QUERY, "detailed", LAT, LON) == (None, None)
+
+
+def test_weather_500_streamed_answer_is_not_cached(failing_weather, offline_pipeline):
+    events = list(genai_service.answer_query_stream(QUERY, LAT, LON, mode="detailed"))
+
+    kind, meta = events[-1]
+    assert kind == "meta"
+    assert "weather" in meta["context"]["failed"]
+    assert offline_pipeline.get(QUERY, "detailed", LAT, LON) == (None, None)
+
+
+def test_weather_500_batch_answer_is_not_cached(failing_weather, offline_pipeline):
+    results = list(genai_service.answer_many([QUERY], LAT, LON, mode="detailed"))
+
+    assert len(results) == 1 and "answer" in results[0]
+    assert results[0]["meta"]["failed"] == ["weather"]
+    assert offline_pipeline.get(QUERY, "detailed", LAT, LON) == (None, None)
+
+
+def test_batch_answers_repeated_questions_once(failing_weather, offline_pipeline):
+    queries = [{"id": "a", "query": QUERY}, {"id": "b", "query": QUERY},
+               {"id": "c", "query": QUERY, "lat": LAT + 1}]
+    results = {r["id"]: r for r in genai_service.answer_many(queries, LAT, LON, mode="detailed")}
+
+    assert set(results) == {"a", "b", "c"}
+    assert results["a"]["meta"]["trace"] is results["b"]["meta"]["trace"]
+    assert results["a"]["meta"]["trace"] is not results["c"]["meta"]["trace"]
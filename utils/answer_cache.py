@@ -0,0 +1,137 @@
+"""
+Two-level answer cache in front of the hybrid pipeline.
+
+Level 1 is an exact match on (normalized query, mode, location bucket).
+Level 2 is a semantic match: the query embedding is compared against cached
+entries for the same mode and location, and a cosine similarity above
+ANSWER_CACHE_SIMILARITY counts as a hit.
+Entries that used live weather expire together with that weather data, so a
+cached answer never outlives the observations it was based on.
+"""
+import re
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config.constants import (
+    ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL, ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_LOC_DECIMALS, WEATHER_CURRENT_REFRESH,
+)
+from utils.weather_cache import next_refresh
+
+_SPACE_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_query(query: str) -> str:
+    """Lower-cases, strips punctuation and collapses whitespace."""
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", query.lower())).strip()
+
+
+class AnswerCache:
+    """
+    Thread-safe, size-bounded (LRU) exact + semantic answer cache.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 similarity: float = ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> {"answer", "expires_at", "vector"}
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+
+    @staticmethod
+    def _scope(mode: str, lat: float, lon: float):
+        return (mode, round(lat, ANSWER_CACHE_LOC_DECIMALS), round(lon, ANSWER_CACHE_LOC_DECIMALS))
+
+    def _purge_expired(self, now: float):
+        for key in [k for k, e in self._entries.items() if e["expires_at"] <= now]:
+            del self._entries[key]
+
+    def get(self, query: str, mode: str, lat: float, lon: float, embed_query=None):
+        """
+        Returns (answer, level) where level is "exact" or "semantic", or (None, None) on a miss.
+        `embed_query` (text -> vector) enables the semantic level.
+        """
+        now = time.time()
+        scope = self._scope(mode, lat, lon)
+        key = (normalize_query(query),) + scope
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires_at"] > now:
+                self._entries.move_to_end(key)
+                self.hits_exact += 1
+                return entry["answer"], "exact"
+            candidates = [
+                (k, e) for k, e in self._entries.items()
+                if k[1:] == scope and e["expires_at"] > now and e["vector"] is not None
+            ]
+
+        if embed_query is not None and candidates:
+            vector = _unit(embed_query(query))
+            scores = np.stack([e["vector"] for _, e in candidates]) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity:
+                with self._lock:
+                    self.hits_semantic += 1
+                    if candidates[best][0] in self._entries:
+                        self._entries.move_to_end(candidates[best][0])
+                return candidates[best][1]["answer"], "semantic"
+
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def put(self, query: str, mode: str, lat: float, lon: float, answer: str,
+            uses_weather: bool = False, embed_query=None, expires_at: float = None):
+        """
+        Stores an answer. Weather-based answers expire at `expires_at` (the expiry of
+        the weather data they used) or, if unknown, at the next live-weather refresh.
+        """
+        now = time.time()
+        if expires_at is None:
+            expires_at = next_refresh(WEATHER_CURRENT_REFRESH, now) if uses_weather else now + ANSWER_CACHE_TTL
+        expires_at = min(expires_at, now + ANSWER_CACHE_TTL)
+        vector = _unit(embed_query(query)) if embed_query is not None else None
+        key = (normalize_query(query),) + self._scope(mode, lat, lon)
+        with self._lock:
+            self._entries[key] = {"answer": answer, "expires_at": expires_at, "vector": vector}
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._purge_expired(now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits_exact": self.hits_exact,
+                "hits_semantic": self.hits_semantic,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Returns the process-wide answer cache shared by all sessions."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnswerCache()
+    return _cache
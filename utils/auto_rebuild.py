@@ -1,31 +1,93 @@
 import os
 import time
+import threading
+
+from config.constants import KNOWLEDGE_DIR, FAISS_INDEX_DIR
 from utils.data_utils import build_vectorstore_from_local_docs
+from utils.logger import get_logger
+
+logger = get_logger("auto_rebuild")
+
+TIMESTAMP_FILE = ".timestamp"
+
+_rebuild_lock = threading.Lock()      # one build at a time
+_worker_lock = threading.Lock()       # guards _worker only, never held during a build
+_worker = None
+_status = {"state": "idle", "last_check": None, "last_build": None, "error": None}
 
-def auto_rebuild_vectorstore(kb_dir="data/knowledge_base", vs_dir="data/vectorstore"):
-    timestamp_file = os.path.join(vs_dir, ".timestamp")
 
-    # Get last recorded timestamp (if any)
-    last_build_time = 0
-    if os.path.exists(timestamp_file):
-        with open(timestamp_file, "r") as f:
-            last_build_time = float(f.read().strip())
+def last_build_time(vs_dir: str = FAISS_INDEX_DIR) -> float:
+    """Start time of the last successful build (0 if none was recorded)."""
+    try:
+        with open(os.path.join(vs_dir, TIMESTAMP_FILE), "r") as f:
+            return float(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return 0.0
 
-    # Get newest modification time in knowledge base
-    newest_doc_time = max(
+
+def needs_rebuild(kb_dir: str = KNOWLEDGE_DIR, vs_dir: str = FAISS_INDEX_DIR) -> bool:
+    """True if a knowledge-base file changed after the last recorded build."""
+    doc_times = [
         os.path.getmtime(os.path.join(kb_dir, f))
         for f in os.listdir(kb_dir)
         if f.endswith((".pdf", ".txt"))
-    )
+    ]
+    return bool(doc_times) and max(doc_times) > last_build_time(vs_dir)
+
+
+def auto_rebuild_vectorstore(kb_dir=KNOWLEDGE_DIR, vs_dir=FAISS_INDEX_DIR):
+    """
+    Rebuilds the vectorstore if the knowledge base changed since the last build.
+    The build goes into a new version directory and is published atomically, so
+    readers keep serving the previous index meanwhile. Only one rebuild runs at a
+    time; a concurrent call waits for it and then re-checks.
+    """
+    with _rebuild_lock:
+        _status["last_check"] = time.time()
+        if not needs_rebuild(kb_dir, vs_dir):
+            print("✅ Vectorstore is already up to date.")
+            return False
 
-    # Rebuild only if needed
-    if newest_doc_time > last_build_time:
         print("🔄 Detected updated knowledge base files. Rebuilding vectorstore...")
-        build_vectorstore_from_local_docs()
+        # Record the start time: files edited during the build trigger the next rebuild
+        started = time.time()
+        _status["state"] = "building"
+        try:
+            build_vectorstore_from_local_docs(kb_dir, vs_dir)
+        except Exception as e:
+            _status["error"] = str(e)
+            raise
+        finally:
+            _status["state"] = "idle"
 
-        # Update timestamp
-        with open(timestamp_file, "w") as f:
-            f.write(str(time.time()))
+        tmp_path = os.path.join(vs_dir, TIMESTAMP_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            f.write(str(started))
+        os.replace(tmp_path, os.path.join(vs_dir, TIMESTAMP_FILE))
+        _status["last_build"], _status["error"] = started, None
         print("✅ Vectorstore refreshed and timestamp updated.")
-    else:
-        print("✅ Vectorstore is already up to date.")
\ No newline at end of file
+        return True
+
+
+def start_background_rebuild(kb_dir=KNOWLEDGE_DIR, vs_dir=FAISS_INDEX_DIR) -> threading.Thread:
+    """
+    Runs auto_rebuild_vectorstore on a background thread and returns immediately.
+    If a background rebuild is already running, that thread is returned instead.
+    """
+    global _worker
+
+    def run():
+        try:
+            auto_rebuild_vectorstore(kb_dir, vs_dir)
+        except Exception as e:
+            logger.error("❌ Background vectorstore rebuild failed: %s", e)
+
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=run, name="vectorstore-rebuild", daemon=True)
+            _worker.start()
+        return _worker
+
+
+def rebuild_status() -> dict:
+    return dict(_status)
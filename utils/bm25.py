@@ -0,0 +1,172 @@
+"""
+Precomputed BM25 inverted index built alongside the FAISS index, plus
+reciprocal-rank fusion (RRF) of lexical and dense hits.
+
+Exact terms (crop varieties, district names, scheme acronyms like NICRA) are
+often missed by dense retrieval alone. The per-posting BM25 weights are computed
+at build time, so a query is just a concatenation of a few posting arrays and a
+weighted bincount. When several indexes (one per collection shard) are searched
+together, corpus_idf() gives IDFs over all of them, so their scores are comparable.
+"""
+import os
+import re
+import pickle
+from collections import Counter
+
+import numpy as np
+
+from config.constants import BM25_K1, BM25_B, RRF_K
+
+BM25_FILE = "bm25.pkl"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the to was were "
+    "will with this these those which what how why when where who can do does".split()
+)
+
+
+def tokenize(text: str):
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _idf(n_docs, doc_freq):
+    return np.log(1.0 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+
+class BM25Index:
+    """
+    Immutable BM25 index over a list of (doc_id, text) pairs.
+    Postings are stored as flat numpy arrays; `terms` maps a term to its slice.
+    """
+
+    def __init__(self, doc_ids, terms, postings_docs, postings_weights):
+        self.doc_ids = doc_ids
+        self.terms = terms
+        self.postings_docs = postings_docs
+        self.postings_weights = postings_weights
+
+    @classmethod
+    def build(cls, doc_ids, texts, k1: float = BM25_K1, b: float = BM25_B):
+        doc_ids = list(doc_ids)
+        term_docs, term_tfs = {}, {}
+        doc_len = np.zeros(len(doc_ids), dtype=np.float32)
+        for n, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len[n] = sum(counts.values())
+            for term, tf in counts.items():
+                term_docs.setdefault(term, []).append(n)
+                term_tfs.setdefault(term, []).append(tf)
+
+        n_docs = max(len(doc_ids), 1)
+        avgdl = float(doc_len.mean()) if len(doc_ids) else 1.0
+        terms, docs_parts, weight_parts, offset = {}, [], [], 0
+        for term in sorted(term_docs):
+            docs = np.asarray(term_docs[term], dtype=np.int32)
+            tf = np.asarray(term_tfs[term], dtype=np.float32)
+            idf = _idf(n_docs, len(docs))
+            norm = tf + k1 * (1.0 - b + b * doc_len[docs] / avgdl)
+            docs_parts.append(docs)
+            weight_parts.append((idf * tf * (k1 + 1.0) / norm).astype(np.float32))
+            terms[term] = (offset, offset + len(docs))
+            offset += len(docs)
+
+        empty_i, empty_f = np.zeros(0, np.int32), np.zeros(0, np.float32)
+        return cls(
+            doc_ids,
+            terms,
+            np.concatenate(docs_parts) if docs_parts else empty_i,
+            np.concatenate(weight_parts) if weight_parts else empty_f,
+        )
+
+    @property
+    def n_docs(self) -> int:
+        return max(len(self.doc_ids), 1)
+
+    def doc_freqs(self, query: str) -> dict:
+        """{term: number of indexed documents containing it} for the query's terms."""
+        return {t: self.terms[t][1] - self.terms[t][0] for t in set(tokenize(query)) if t in self.terms}
+
+    def search(self, query: str, k: int, allowed: np.ndarray = None, idf: dict = None):
+        """
+        Top-k (doc_id, score) pairs, best first. `allowed` is an optional boolean mask
+        over the indexed documents; other documents are never returned. `idf`
+        ({term: idf}, see corpus_idf) replaces this index's own IDF of the query terms.
+        """
+        slices = [(t,) + self.terms[t] for t in set(tokenize(query)) if t in self.terms]
+        if not slices:
+            return []
+        docs = np.concatenate([self.postings_docs[s:e] for _, s, e in slices])
+        if idf is None:
+            weights = np.concatenate([self.postings_weights[s:e] for _, s, e in slices])
+        else:
+            # The stored weights are idf * tf-part: swap in the given idf per term
+            weights = np.concatenate([
+                self.postings_weights[s:e] * np.float32(idf[t] / _idf(self.n_docs, e - s))
+                for t, s, e in slices
+            ])
+        if allowed is not None:
+            keep = allowed[docs]
+            docs, weights = docs[keep], weights[keep]
+            if not len(docs):
+                return []
+        uniq, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(self.doc_ids[uniq[i]], float(scores[i])) for i in top]
+
+    def save(self, vs_dir: str):
+        path = os.path.join(vs_dir, BM25_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                (self.doc_ids, self.terms, self.postings_docs, self.postings_weights),
+                f, protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, vs_dir: str):
+        """Returns the saved index, or None if it has not been built."""
+        path = os.path.join(vs_dir, BM25_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return cls(*pickle.load(f))
+
+
+def build_bm25_for_store(db, vs_dir: str) -> BM25Index:
+    """Builds and saves the BM25 index over every chunk in a FAISS store."""
+    doc_ids = list(db.index_to_docstore_id.values())
+    texts = (db.docstore.search(i).page_content for i in doc_ids)
+    index = BM25Index.build(doc_ids, texts)
+    index.save(vs_dir)
+    return index
+
+
+def corpus_idf(indexes, query: str) -> dict:
+    """
+    IDF of the query terms over the union of several indexes (their summed document
+    counts and document frequencies), for search(..., idf=...).
+    """
+    n_docs, doc_freq = 0, Counter()
+    for index in indexes:
+        n_docs += index.n_docs
+        doc_freq.update(index.doc_freqs(query))
+    return {t: float(_idf(n_docs, df)) for t, df in doc_freq.items()}
+
+
+def reciprocal_rank_fusion(*rankings, k: int = RRF_K):
+    """
+    Fuses ranked lists of doc ids: score(d) = sum over lists of 1 / (k + rank).
+    Returns doc ids ordered by fused score.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
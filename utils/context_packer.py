@@ -0,0 +1,147 @@
+"""
+Token-budgeted packing of retrieved chunks into prompt context.
+
+Knowledge-base chunks overlap by KB_CHUNK_OVERLAP characters, so the top hits for a
+query often repeat the same text. The packer
+  1. merges hits from the same file that overlap or touch (using the chunk offsets),
+  2. selects passages by maximal marginal relevance (MMR): relevance is mostly the fused
+     (dense + BM25) retrieval rank, so exact-term matches keep their place, blended
+     with the query cosine; redundancy and near-duplicates are judged on the chunk
+     embeddings, which the embedding cache already holds, and
+  3. stops at the token budget of the response mode.
+Token counts are estimated at CHARS_PER_TOKEN characters per token.
+"""
+import numpy as np
+
+from config.constants import (
+    CONTEXT_TOKEN_BUDGETS, CONTEXT_MMR_LAMBDA, CONTEXT_RANK_WEIGHT, CONTEXT_DUP_SIMILARITY,
+    CONTEXT_PASSAGE_OVERHEAD, CHARS_PER_TOKEN, RRF_K,
+)
+from utils.kb_catalog import pages_label
+
+MERGE_GAP = 2       # characters (stripped whitespace) allowed between touching chunks
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def budget_for(mode: str) -> int:
+    return CONTEXT_TOKEN_BUDGETS.get(mode, CONTEXT_TOKEN_BUDGETS["detailed"])
+
+
+def merge_overlapping(chunks) -> list:
+    """
+    Merges chunks of the same file whose character ranges overlap or touch into one
+    passage. Each passage keeps the best rank of its members and the member texts
+    (for their embeddings). Chunks without offsets stay as they are.
+    """
+    passages, by_source = [], {}
+    for c in chunks:
+        if c.get("start_index") is None:
+            passages.append(dict(c, members=[c["content"]]))
+        else:
+            by_source.setdefault(c["source"], []).append(c)
+
+    for group in by_source.values():
+        group.sort(key=lambda c: c["start_index"])
+        current = None
+        for c in group:
+            if current is not None and c["start_index"] <= current["end_index"] + MERGE_GAP:
+                if c["end_index"] > current["end_index"]:
+                    overlap = current["end_index"] - c["start_index"]
+                    joint = c["content"][overlap:] if overlap > 0 else "\n" + c["content"]
+                    current["content"] += joint
+                    current["end_index"] = c["end_index"]
+                    if c.get("page_end") is not None:
+                        current["page_end"] = c["page_end"]
+                current["rank"] = min(current["rank"], c["rank"])
+                current["members"].append(c["content"])
+                continue
+            current = dict(c, members=[c["content"]])
+            passages.append(current)
+
+    for p in passages:
+        p["pages"] = pages_label(p.get("page_start"), p.get("page_end")) or p.get("pages")
+    return sorted(passages, key=lambda p: p["rank"])
+
+
+def _scaled(values: np.ndarray) -> np.ndarray:
+    """Min-max scales values to [0, 1] (all ones if they are equal)."""
+    spread = values.max() - values.min()
+    return (values - values.min()) / spread if spread > 0 else np.ones_like(values)
+
+
+def _unit(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def pack_context(query: str, chunks, budget: int, embeddings=None):
+    """
+    Packs ranked chunk dicts (see chains.rag_chain.retrieve_chunks) into at most
+    `budget` tokens. Returns (passages, stats): passages are chunk dicts renumbered in
+    selection order; stats reports tokens used vs. budget and what was merged or dropped.
+    """
+    stats = {"budget": budget, "tokens": 0, "candidates": len(chunks), "passages": 0,
+             "merged": 0, "duplicates_dropped": 0, "over_budget_dropped": 0, "truncated": False}
+    if not chunks:
+        return [], stats
+    if embeddings is None:
+        from models.embeddings import get_embeddings
+        embeddings = get_embeddings()
+
+    passages = merge_overlapping(chunks)
+    stats["merged"] = len(chunks) - len(passages)
+
+    # --- Passage vectors: mean of the (cached) member chunk vectors
+    members = [text for p in passages for text in p["members"]]
+    member_vectors = _unit(embeddings.embed_documents(members))
+    vectors, offset = [], 0
+    for p in passages:
+        vectors.append(member_vectors[offset:offset + len(p["members"])].mean(axis=0))
+        offset += len(p["members"])
+    vectors = _unit(vectors)
+    # Relevance: the fused retrieval rank (RRF-style 1 / (k + rank)) blended with the
+    # query cosine, both scaled to [0, 1]; redundancy below uses the cosine only
+    rank_score = np.asarray([1.0 / (RRF_K + p["rank"]) for p in passages], dtype=np.float32)
+    cosine = vectors @ _unit(embeddings.embed_query(query))
+    relevance = CONTEXT_RANK_WEIGHT * _scaled(rank_score) + (1 - CONTEXT_RANK_WEIGHT) * _scaled(cosine)
+
+    # --- MMR selection within the budget
+    selected, used = [], 0
+    remaining = list(range(len(passages)))
+    while remaining:
+        if selected:
+            redundancy = (vectors[remaining] @ vectors[selected].T).max(axis=1)
+            scores = CONTEXT_MMR_LAMBDA * relevance[remaining] - (1 - CONTEXT_MMR_LAMBDA) * redundancy
+            best = int(np.argmax(scores))
+        else:
+            # Seed with the top fused hit, so it is never the one that misses the budget
+            redundancy = np.zeros(len(remaining), dtype=np.float32)
+            best = int(np.argmin([passages[i]["rank"] for i in remaining]))
+        i = remaining.pop(best)
+        if redundancy[best] >= CONTEXT_DUP_SIMILARITY:
+            stats["duplicates_dropped"] += 1
+            continue
+        cost = estimate_tokens(passages[i]["content"]) + CONTEXT_PASSAGE_OVERHEAD
+        if used + cost > budget:
+            room = budget - used - CONTEXT_PASSAGE_OVERHEAD
+            if selected or room <= 0:
+                stats["over_budget_dropped"] += 1
+                continue
+            # The most relevant passage alone exceeds the budget: keep its head
+            passages[i]["content"] = passages[i]["content"][:room * CHARS_PER_TOKEN]
+            cost = estimate_tokens(passages[i]["content"]) + CONTEXT_PASSAGE_OVERHEAD
+            stats["truncated"] = True
+        selected.append(i)
+        used += cost
+
+    packed = []
+    for rank, i in enumerate(selected, start=1):
+        p = {k: v for k, v in passages[i].items() if k != "members"}
+        p["rank"] = rank
+        packed.append(p)
+    stats.update(tokens=used, passages=len(packed))
+    return packed, stats
@@ -1,65 +1,364 @@
 """
 Data utilities: chunking, embedding ingestion helper, simple realtime API fetchers.
+
+Ingestion is streamed: knowledge-base files are read INGEST_READ_SIZE characters at a
+time, split into overlapping chunks as they arrive, and new chunks are embedded
+EMBED_BATCH_SIZE at a time, so neither whole files nor the embedding work of the
+corpus are held in memory at once (vectors awaiting IVF / PQ training are spilled to
+disk). The store being built does grow with the corpus: the docstore keeps every
+chunk text, the index is in RAM while it is modified, and BM25 postings cover all chunks.
 """
 import os
 import math
 import json
-import requests
-from typing import List
-from sentence_transformers import SentenceTransformer
+import bisect
+from typing import Iterable, Iterator, List, Tuple
 import numpy as np
 
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from config.constants import CHUNK_SIZE, FAISS_INDEX_DIR, KNOWLEDGE_DIR, EMBEDDING_MODEL
+# Embedding models and FAISS are imported inside build_vectorstore_from_local_docs, so the
+# weather helpers below do not pull in torch / sentence-transformers
+from config.constants import (
+    CHUNK_SIZE, FAISS_INDEX_DIR, KNOWLEDGE_DIR, EMBEDDING_MODEL, KB_CHUNK_SIZE, KB_CHUNK_OVERLAP,
+    FAISS_INDEX_TYPE, WEATHER_FORECAST_REFRESH, INGEST_READ_SIZE, EMBED_BATCH_SIZE,
+)
+from config.config import OPEN_METEO_BASE
+from utils.weather_cache import weather_cache
+from utils import http_client
+
+PAGE_SEPARATOR = "\f"           # written between pages by pdf_to_text_batch.py
+
+def iter_chunk_text(text: str, size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Fixed-size, non-overlapping chunks of `text`, yielded lazily."""
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
 
 def chunk_text(text: str, size: int = CHUNK_SIZE) -> List[str]:
-    if not text:
-        return []
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + size
-        chunks.append(text[start:end])
-        start = end
-    return chunks
-
-def build_vectorstore_from_local_docs():
-    import os
-    from langchain_community.vectorstores import FAISS
-    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return list(iter_chunk_text(text, size))
+
+def read_blocks(path: str, size: int = INGEST_READ_SIZE) -> Iterator[str]:
+    """Yields the text of a UTF-8 file `size` characters at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        for block in iter(lambda: f.read(size), ""):
+            yield block
+
+def iter_text_chunks(blocks: Iterable[str], chunk_size: int = KB_CHUNK_SIZE,
+                     chunk_overlap: int = KB_CHUNK_OVERLAP) -> Iterator[Tuple[str, int, int]]:
+    """
+    Splits a stream of text blocks with the knowledge-base splitter without holding the
+    whole text. Yields (chunk, start, end) with character offsets into the concatenated
+    text. Each buffer is split, chunks ending at least chunk_size characters before its
+    end are emitted (they cannot depend on text not read yet), and the buffer is carried
+    over from the start of the first held-back chunk, so overlap spans read boundaries.
+    """
     from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-    kb_path = "data/knowledge_base"
-    vs_path = "data/vectorstore"
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    blocks = iter(blocks)
+    carry, base = "", 0          # unemitted text and its offset in the stream
+    block = next(blocks, None)
+    while block is not None:
+        following = next(blocks, None)
+        buffer = carry + block
+        final = following is None
+        safe_end = len(buffer) if final else len(buffer) - chunk_size
+        cut, search_from = 0, 0
+        for chunk in splitter.split_text(buffer):
+            start = buffer.find(chunk, search_from)
+            end = start + len(chunk)
+            if end > safe_end:
+                cut = start
+                break
+            yield chunk, base + start, base + end
+            cut, search_from = end, max(start + 1, end - chunk_overlap)
+        carry, base = buffer[cut:], base + cut
+        block = following
 
-    os.makedirs(vs_path, exist_ok=True)
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+def has_page_breaks(path: str, block_size: int = 1 << 20) -> bool:
+    """True if the file contains page separators (text extracted from a PDF)."""
+    separator = PAGE_SEPARATOR.encode("ascii")
+    with open(path, "rb") as f:
+        return any(separator in block for block in iter(lambda: f.read(block_size), b""))
+
+def iter_file_chunks(path: str, read_size: int = INGEST_READ_SIZE, paged: bool = False):
+    """
+    (chunk, start, end, pages) for one knowledge-base file, read incrementally.
+    With `paged`, pages is the 1-based (first, last) page range of the chunk, counted
+    from the page separators read so far; otherwise it is None.
+    """
+    breaks = []     # offsets of the page separators seen so far
+
+    def blocks():
+        offset = 0
+        for block in read_blocks(path, read_size):
+            if paged:
+                pos = block.find(PAGE_SEPARATOR)
+                while pos != -1:
+                    breaks.append(offset + pos)
+                    pos = block.find(PAGE_SEPARATOR, pos + 1)
+            offset += len(block)
+            yield block
 
-    docs = []
-    for filename in os.listdir(kb_path):
+    for chunk, start, end in iter_text_chunks(blocks()):
+        pages = None
+        if paged:
+            pages = (bisect.bisect_left(breaks, start) + 1, bisect.bisect_left(breaks, end - 1) + 1)
+        yield chunk, start, end, pages
+
+def build_vectorstore_from_local_docs(kb_path: str = KNOWLEDGE_DIR, vs_path: str = FAISS_INDEX_DIR):
+    """
+    Builds a new vectorstore version without touching the one readers are using.
+    The current version is copied into a staging directory, updated incrementally
+    there and, if anything changed, published by atomically moving the CURRENT
+    pointer (see utils/vectorstore_versions.py). Returns {collection: store} for
+    the index shards ({} if the knowledge base has no documents).
+    """
+    from utils.vectorstore_versions import stage_version, publish, discard
+
+    staging = stage_version(vs_path)
+    try:
+        stores, changed = _update_shards(kb_path, staging)
+    except BaseException:
+        discard(staging)
+        raise
+    if changed:
+        final = publish(vs_path, staging)
+        print("✅ Vectorstore version published:", final)
+    else:
+        discard(staging)
+    return stores
+
+def _update_shards(kb_path: str, version_dir: str):
+    """
+    Updates one index shard per knowledge-base collection under version_dir/shards,
+    each incrementally with its own manifest. Shards of collections that no longer
+    have files are removed, as is a pre-shard single store at the version root.
+    Returns ({collection: store}, changed).
+    """
+    import shutil
+    from utils.kb_catalog import collection_for
+    from utils.vectorstore_versions import SHARDS_DIR
+
+    groups = {}
+    for filename in sorted(os.listdir(kb_path)):
         if filename.endswith(".txt"):
-            file_path = os.path.join(kb_path, filename)
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
-                docs.append(text)
-
-    # Split text into chunks
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = text_splitter.create_documents(docs)
-
-    # Build FAISS index
-    print("🔍 Generating embeddings and creating FAISS index...")
-    db = FAISS.from_documents(chunks, embeddings)
-    db.save_local(vs_path)
+            groups.setdefault(collection_for(filename), []).append(filename)
 
-    print("✅ Vectorstore successfully built and saved in:", vs_path)
+    changed = False
+    for name in os.listdir(version_dir):
+        if os.path.isfile(os.path.join(version_dir, name)):
+            os.remove(os.path.join(version_dir, name))      # legacy single store
+            changed = True
+    shards_root = os.path.join(version_dir, SHARDS_DIR)
+    os.makedirs(shards_root, exist_ok=True)
+    for name in os.listdir(shards_root):
+        if name not in groups:
+            print(f"🗑️ Removing shard '{name}' (no files left in the collection)")
+            shutil.rmtree(os.path.join(shards_root, name))
+            changed = True
 
-def get_realtime_weather(lat: float, lon: float):
+    stores = {}
+    for collection, filenames in groups.items():
+        print(f"📚 Shard '{collection}': {len(filenames)} file(s)")
+        db, shard_changed = _update_vectorstore(kb_path, os.path.join(shards_root, collection), filenames)
+        changed = changed or shard_changed
+        if db is not None:
+            stores[collection] = db
+    if not groups:
+        print("⚠️ No .txt documents found in", kb_path)
+    return stores, changed
+
+def _update_vectorstore(kb_path: str, vs_path: str, filenames: List[str] = None):
     """
-    Simple wrapper to fetch basic weather forecast from Open-Meteo API.
+    Incrementally builds one FAISS store from the given .txt files of the knowledge base
+    (all of them by default).
+    A manifest of file and chunk hashes is kept next to the index: unchanged files are
+    skipped, and for edited files only new chunks are embedded while chunks that
+    disappeared are deleted from the index. Changed files are streamed through the
+    chunker and new chunks are embedded in EMBED_BATCH_SIZE batches. A new IVF / PQ
+    index is trained after streaming, with nlist sized for the whole shard and centroids
+    sampled across all of its files. Changing the chunking parameters, the
+    embedding model or FAISS_INDEX_TYPE triggers a full rebuild. The BM25 lexical
+    index (bm25.pkl) is rebuilt from the chunk store whenever the index changes. A size and search
+    latency report is written to build_report.json after every build.
+    Chunk metadata records the source file, its collection and year, character offsets
+    and, for text extracted from PDFs, the page range.
+    Works in place on vs_path and returns (store, changed).
     """
-    url = "https://api.open-meteo.com/v1/forecast"
+    import os
+    import json
+    from models.embeddings import get_embeddings
+    from utils.kb_catalog import describe_source
+    from utils.bm25 import build_bm25_for_store, BM25_FILE
+    from utils.faiss_index import (
+        build_store, build_store_from_vectors, load_store, needs_training, supports_remove, index_report,
+    )
+    from utils.vectorstore_versions import unshare
+    from utils.vectorstore_manifest import (
+        file_sha256, chunk_id_factory, new_manifest, load_manifest, save_manifest,
+    )
+
+    os.makedirs(vs_path, exist_ok=True)
+    params = {
+        "chunk_size": KB_CHUNK_SIZE,
+        "chunk_overlap": KB_CHUNK_OVERLAP,
+        "embedding_model": EMBEDDING_MODEL,
+        "index_type": FAISS_INDEX_TYPE,
+    }
+
+    # --- 1. Load the previous manifest + index (full rebuild if either is unusable)
+    manifest = load_manifest(vs_path)
+    db = None
+    if manifest is not None and manifest.get("params") == params:
+        try:
+            db = load_store(vs_path, get_embeddings(), mmap=False)
+        except Exception as e:
+            print(f"⚠️ Existing index unreadable ({e}); rebuilding from scratch.")
+    if db is None:
+        manifest = new_manifest(**params)
+    old_files = manifest["files"]
+    # Approximate indexes cannot drop vectors in place; with removals they are rebuilt below
+    rebuild_on_remove = db is not None and not supports_remove(FAISS_INDEX_TYPE)
+
+    pending = []                 # (id, text, metadata) waiting to be embedded
+    counts = {"added": 0, "moved": 0}
+    # A new IVF / PQ index is trained once every vector is known (nlist sized for the
+    # whole shard, centroids sampled across all files): until then embedded batches are
+    # spilled to disk and their chunks kept for the docstore
+    spill_path = os.path.join(vs_path, ".vectors.spill")
+    deferred = []                # (id, text, metadata) whose vectors are in the spill file
+
+    def flush():
+        nonlocal db
+        if not pending:
+            return
+        ids, texts, metas = (list(col) for col in zip(*pending))
+        if db is None and needs_training(FAISS_INDEX_TYPE):
+            vectors = np.asarray(get_embeddings().embed_documents(texts), dtype=np.float32)
+            with open(spill_path, "ab" if deferred else "wb") as f:
+                f.write(vectors.tobytes())
+            deferred.extend(pending)
+        elif db is None:
+            db, _ = build_store(texts, metas, ids, get_embeddings(), FAISS_INDEX_TYPE)
+        else:
+            db.add_texts(texts, metadatas=metas, ids=ids)
+        counts["added"] += len(pending)
+        pending.clear()
+
+    def train_deferred():
+        nonlocal db
+        if not deferred:
+            return
+        ids, texts, metas = (list(col) for col in zip(*deferred))
+        try:
+            dim = os.path.getsize(spill_path) // (4 * len(deferred))
+            vectors = np.memmap(spill_path, dtype=np.float32, mode="r", shape=(len(deferred), dim))
+            print(f"🧮 Training {FAISS_INDEX_TYPE} index over {len(deferred)} vectors...")
+            db = build_store_from_vectors(vectors, texts, metas, ids, get_embeddings(), FAISS_INDEX_TYPE)
+            del vectors
+        finally:
+            os.remove(spill_path)
+        deferred.clear()
+
+    def enqueue(chunk_id, text, meta):
+        pending.append((chunk_id, text, meta))
+        if len(pending) >= EMBED_BATCH_SIZE:
+            flush()
+
+    # --- 2. Stream changed files through the chunker and embed new chunks in batches
+    files, remove_ids = {}, []
+    if filenames is None:
+        filenames = [f for f in sorted(os.listdir(kb_path)) if f.endswith(".txt")]
+    for filename in filenames:
+        file_path = os.path.join(kb_path, filename)
+        digest = file_sha256(file_path)
+        previous = old_files.get(filename)
+        if previous and previous["sha256"] == digest:
+            files[filename] = previous
+            continue
+
+        next_id = chunk_id_factory(filename)
+        old_ids = set(previous["chunks"]) if previous else set()
+        ids = []
+        source = describe_source(filename)
+        for text, start, end, pages in iter_file_chunks(file_path, paged=has_page_breaks(file_path)):
+            chunk_id = next_id(text)
+            ids.append(chunk_id)
+            meta = dict(source, start_index=start, end_index=end)
+            if pages:
+                meta["page_start"], meta["page_end"] = pages
+            if chunk_id not in old_ids:
+                enqueue(chunk_id, text, meta)
+            elif db is not None:
+                # Kept chunk of an edited file: its vector is reused, its offsets may have moved
+                doc = db.docstore.search(chunk_id)
+                if hasattr(doc, "metadata") and any(doc.metadata.get(k) != v for k, v in meta.items()):
+                    doc.metadata.update(meta)
+                    counts["moved"] += 1
+        remove_ids.extend(old_ids - set(ids))
+        files[filename] = {"sha256": digest, "chunks": ids}
+    flush()
+    train_deferred()
+
+    for filename, previous in old_files.items():
+        if filename not in files:
+            remove_ids.extend(previous["chunks"])
+
+    if db is not None and not counts["added"] and not remove_ids and not counts["moved"]:
+        changed = False
+        if not os.path.exists(os.path.join(vs_path, BM25_FILE)):
+            build_bm25_for_store(db, vs_path)
+            changed = True
+        if files != old_files:
+            manifest["files"] = files
+            save_manifest(vs_path, manifest)
+            changed = True
+        print("✅ Vectorstore already up to date")
+        return db, changed
+
+    # --- 3. Drop stale chunks
+    print(f"🔍 Embedded {counts['added']} new chunks, removing {len(remove_ids)} stale chunks...")
+    if remove_ids and rebuild_on_remove:
+        # Retrain over the surviving chunks in batches; their vectors come straight
+        # from the embedding cache
+        removed = set(remove_ids)
+        old_db, db = db, None
+        for doc_id in old_db.index_to_docstore_id.values():
+            if doc_id not in removed:
+                doc = old_db.docstore.search(doc_id)
+                enqueue(doc_id, doc.page_content, doc.metadata)
+        flush()
+        train_deferred()
+        del old_db
+    elif db is not None and remove_ids:
+        db.delete(remove_ids)
+    if db is None:
+        print("⚠️ No .txt documents found in", kb_path)
+        return None, False
+
+    # save_local and the report write in place: detach them from the published version first
+    unshare(vs_path, "index.faiss", "index.pkl", "build_report.json")
+    db.save_local(vs_path)
+    build_bm25_for_store(db, vs_path)
+    manifest["files"] = files
+    save_manifest(vs_path, manifest)
+
+    # --- 4. Report index size and search latency (sample queries are cached chunk vectors)
+    sample_ids = list(db.index_to_docstore_id.values())[:100]
+    queries = np.asarray(
+        get_embeddings().embed_documents([db.docstore.search(i).page_content for i in sample_ids]),
+        dtype=np.float32,
+    )
+    report = index_report(db.index, FAISS_INDEX_TYPE, queries, os.path.join(vs_path, "index.faiss"))
+    with open(os.path.join(vs_path, "build_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print("✅ Vectorstore successfully built and saved in:", vs_path)
+    print(f"📊 {report['index_type']} index: {report['vectors']} vectors, "
+          f"{report['size_bytes'] / 1e6:.1f} MB, search p50 {report['search'].get('p50_ms')} ms")
+    return db, True
+
+def _fetch_forecast(lat: float, lon: float):
+    url = OPEN_METEO_BASE
     params = {
         "latitude": lat,
         "longitude": lon,
@@ -67,10 +366,18 @@ def get_realtime_weather(lat: float, lon: float):
         "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum",
         "timezone": "auto"
     }
-    resp = requests.get(url, params=params, timeout=10)
+    resp = http_client.get(url, params=params)
     resp.raise_for_status()
     return resp.json()
 
+def get_realtime_weather(lat: float, lon: float):
+    """
+    Simple wrapper to fetch basic weather forecast from Open-Meteo API.
+    Responses are shared per forecast grid cell and refreshed hourly (see utils/weather_cache.py).
+    """
+    data, _ = weather_cache.get_or_fetch("forecast", lat, lon, WEATHER_FORECAST_REFRESH, _fetch_forecast)
+    return data
+
 def get_realtime_weather_summary(lat: float, lon: float) -> str:
     """
     Produce a human-readable summary for quick context insertion into LLM prompt.
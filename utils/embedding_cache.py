@@ -0,0 +1,291 @@
+"""
+Persistent on-disk embedding cache shared by ingestion and query-time retrieval.
+
+Vectors are keyed by (model name, text hash) and stored per model as a memory-mapped
+float32 matrix (vectors.f32) plus an append-only index journal (index.log) that maps
+text hashes to matrix rows. The cache is bounded: once it holds `max_entries` vectors
+the least recently used rows are recycled for new entries. Processes sharing the
+directory coordinate through an flock on its lock file.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.constants import EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_MAX_ENTRIES
+from utils.logger import get_logger
+
+try:
+    import fcntl
+except ImportError:     # Windows: no cross-process locking, keep to one process per cache
+    fcntl = None
+
+logger = get_logger("embedding_cache")
+
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.log"
+LOCK_FILE = "lock"
+
+
+def text_key(text: str, namespace: str = "doc") -> str:
+    """Stable hash for a text; queries and documents live in separate namespaces."""
+    return hashlib.blake2b(f"{namespace}\0{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Bounded, thread-safe vector cache for one embedding model. Several processes may
+    share the cache directory: writes hold an exclusive lock on it (reads a shared one)
+    and each process replays the journal lines other processes appended before using
+    its row map.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = EMBEDDING_CACHE_DIR,
+                 max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.dir = os.path.join(cache_dir, model_name.replace("/", "__"))
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(self.dir, exist_ok=True)
+        self._lock_file = open(os.path.join(self.dir, LOCK_FILE), "a")
+        self._reset()
+        with self._file_lock(exclusive=False):
+            self._sync()
+        if self._rows:
+            logger.info("Embedding cache loaded: %d vectors from %s", len(self._rows), self.dir)
+
+    def _reset(self):
+        self._rows = OrderedDict()      # key -> row, least recently used first
+        self._owners = {}               # row -> key
+        self._free_rows = set()
+        self._dim = None
+        self._capacity = 0
+        self._vectors = None
+        self._journal_lines = 0
+        self._journal_id = None         # inode of the journal read so far
+        self._journal_offset = 0        # bytes of it already replayed
+
+    # ------------------------------------------------------------------ storage
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.dir, VECTORS_FILE)
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.dir, INDEX_FILE)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Cross-process lock on the cache directory (shared for reads, exclusive for writes)."""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _sync(self):
+        """
+        Catches up with other processes (call with the file lock held): maps rows added
+        by growth and replays journal lines appended since the last read. A journal
+        replaced by compaction is replayed from the start.
+        """
+        try:
+            stat = os.stat(self._index_path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._journal_id or stat.st_size < self._journal_offset:
+            self._reset()
+        elif stat.st_size == self._journal_offset:
+            return
+
+        with open(self._index_path, "rb") as f:
+            if self._journal_offset == 0:
+                self._journal_id = os.fstat(f.fileno()).st_ino
+                header = f.readline().split()
+                if len(header) != 2 or header[0] != b"dim":
+                    logger.warning("Ignoring malformed embedding cache in %s", self.dir)
+                    self._journal_offset = stat.st_size
+                    return
+                self._dim = int(header[1])
+            else:
+                f.seek(self._journal_offset)
+            # Writers append whole lines under the exclusive lock, so this ends on a line break
+            data = f.read()
+            self._journal_offset = f.tell()
+
+        self._map_vectors()
+        for line in data.decode("utf-8").splitlines():
+            parts = line.split()
+            if len(parts) != 2:
+                continue
+            self._journal_lines += 1
+            key, row = parts[0], int(parts[1])
+            if row >= self._capacity:
+                continue
+            # Later lines override earlier ones for a row (and for a key)
+            previous_owner = self._owners.get(row)
+            if previous_owner is not None and previous_owner != key:
+                del self._rows[previous_owner]
+            previous_row = self._rows.pop(key, None)
+            if previous_row is not None and previous_row != row:
+                del self._owners[previous_row]
+                self._free_rows.add(previous_row)
+            self._rows[key] = row
+            self._owners[row] = key
+            self._free_rows.discard(row)
+
+    def _map_vectors(self):
+        """Maps the vector matrix again when the file has grown; new rows are free."""
+        try:
+            capacity = os.path.getsize(self._vectors_path) // (4 * self._dim)
+        except FileNotFoundError:
+            capacity = 0
+        if capacity <= self._capacity:
+            return
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                  shape=(capacity, self._dim))
+        self._free_rows.update(r for r in range(self._capacity, capacity) if r not in self._owners)
+        self._capacity = capacity
+
+    def _grow(self, needed: int):
+        """Extends the memory-mapped matrix so at least `needed` more rows are free."""
+        new_capacity = min(self.max_entries, max(self._capacity * 2, self._capacity + needed, 1024))
+        if new_capacity <= self._capacity:
+            return
+        with open(self._vectors_path, "ab") as f:
+            # Never shrink the file: other processes may have mapped rows beyond ours
+            if os.fstat(f.fileno()).st_size < new_capacity * self._dim * 4:
+                f.truncate(new_capacity * self._dim * 4)
+        self._map_vectors()
+
+    def _compact_journal(self):
+        """
+        Rewrites the journal with only the live mappings, in LRU order. Call with the
+        exclusive lock held right after _sync, so the mappings of every process are live.
+        """
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(f"dim {self._dim}\n")
+            f.writelines(f"{key} {row}\n" for key, row in self._rows.items())
+        os.replace(tmp_path, self._index_path)
+        stat = os.stat(self._index_path)
+        self._journal_id, self._journal_offset = stat.st_ino, stat.st_size
+        self._journal_lines = len(self._rows)
+
+    # --------------------------------------------------------------------- API
+    def get_many(self, keys: List[str]):
+        """Cached vectors for the keys (None for misses); hits are marked as recently used."""
+        out = []
+        with self._lock, self._file_lock(exclusive=False):
+            self._sync()
+            for key in keys:
+                row = self._rows.get(key)
+                if row is None:
+                    out.append(None)
+                else:
+                    self._rows.move_to_end(key)
+                    out.append(np.array(self._vectors[row]))
+        return out
+
+    def put_many(self, keys: List[str], vectors):
+        """Stores vectors, recycling the least recently used rows when the cache is full."""
+        if not keys:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock(exclusive=True):
+            self._sync()
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                self._compact_journal()
+            elif vectors.shape[1] != self._dim:
+                logger.warning("Embedding dimension changed (%d -> %d); not caching",
+                               self._dim, vectors.shape[1])
+                return
+
+            fresh = [(k, v) for k, v in zip(keys, vectors) if k not in self._rows]
+            fresh = list(dict(fresh).items())[-self.max_entries:]
+            if len(fresh) > len(self._free_rows):
+                self._grow(len(fresh) - len(self._free_rows))
+
+            lines = []
+            for key, vector in fresh:
+                if self._free_rows:
+                    row = self._free_rows.pop()
+                else:
+                    _, row = self._rows.popitem(last=False)  # evict least recently used
+                self._vectors[row] = vector
+                self._rows[key] = row
+                self._owners[row] = key
+                lines.append(f"{key} {row}\n")
+            if not lines:
+                return
+
+            # Vectors must be on disk before the journal points at them
+            self._vectors.flush()
+            with open(self._index_path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+                f.flush()
+                self._journal_offset = f.tell()
+            self._journal_lines += len(lines)
+            if self._journal_lines > 2 * max(len(self._rows), 1024):
+                self._compact_journal()
+
+    def __len__(self):
+        return len(self._rows)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain Embeddings wrapper that serves repeated texts from an EmbeddingCache.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def _embed_cached(self, texts: List[str], namespace: str) -> List[List[float]]:
+        keys = [text_key(t, namespace) for t in texts]
+        vectors = self.cache.get_many(keys)
+
+        # Embed each distinct missing text once, in a single model call
+        missing = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        if missing:
+            miss_keys = list(missing)
+            computed = self.embeddings.embed_documents([missing[k] for k in miss_keys])
+            self.cache.put_many(miss_keys, computed)
+            by_key = dict(zip(miss_keys, computed))
+            vectors = [by_key[k] if v is None else v for k, v in zip(keys, vectors)]
+
+        return [np.asarray(v, dtype=np.float32).tolist() for v in vectors]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_cached(texts, "doc")
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Batch query embedding. Sentence-transformer models embed queries and documents
+        identically, so misses go through one embed_documents call.
+        """
+        return self._embed_cached(texts, "query")
+
+    def embed_query(self, text: str) -> List[float]:
+        key = text_key(text, namespace="query")
+        cached = self.cache.get_many([key])[0]
+        if cached is not None:
+            return cached.tolist()
+        vector = self.embeddings.embed_query(text)
+        self.cache.put_many([key], [vector])
+        return list(vector)
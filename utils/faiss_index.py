@@ -0,0 +1,231 @@
+"""
+FAISS index construction and loading for the knowledge-base vectorstore.
+
+The index type is selected with FAISS_INDEX_TYPE in config/constants.py:
+  - "flat":  exact search, no training (default, fine for small corpora)
+  - "ivf":   inverted lists over k-means cells, searched with FAISS_IVF_NPROBE probes
+  - "hnsw":  graph index, searched with FAISS_HNSW_EF_SEARCH
+  - "ivfpq": IVF with product-quantized codes (smallest memory footprint, approximate)
+Indexes are saved in the LangChain layout (index.faiss + index.pkl) and opened
+memory-mapped, so worker processes start fast and share the OS page cache.
+faiss itself is imported inside the functions that use it, so importing this module
+(e.g. through services/retrieval_engine.py at app start-up) stays cheap.
+"""
+import os
+import math
+import time
+import pickle
+
+import numpy as np
+
+from config.constants import (
+    FAISS_INDEX_TYPE, FAISS_IVF_NLIST, FAISS_IVF_NPROBE, FAISS_HNSW_M,
+    FAISS_HNSW_EF_SEARCH, FAISS_PQ_M, FAISS_MMAP, RAG_TOP_K,
+)
+from utils.logger import get_logger
+
+logger = get_logger("faiss_index")
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+
+
+def supports_remove(index_type: str) -> bool:
+    """
+    Whether vectors can be deleted in place. LangChain renumbers positions after
+    a delete, which only matches FAISS semantics for flat indexes; IVF keeps its
+    ids and HNSW cannot remove at all, so those are rebuilt instead.
+    """
+    return index_type == "flat"
+
+
+def needs_training(index_type: str) -> bool:
+    """Whether the index must be trained (IVF k-means / PQ codebooks) before vectors are added."""
+    return index_type in ("ivf", "ivfpq")
+
+
+def _nlist_for(n_vectors: int) -> int:
+    # ~4*sqrt(N) cells, capped by config, and never more cells than training points
+    return max(1, min(FAISS_IVF_NLIST, int(4 * math.sqrt(n_vectors)), n_vectors))
+
+
+def create_index(index_type: str, vectors: np.ndarray):
+    """
+    Creates and (if required) trains an empty index of the given type. nlist is sized
+    for all of `vectors` and training uses a random sample of at most 256 vectors per
+    cell; `vectors` may be a memmap, of which only the sample is read.
+    """
+    import faiss
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS_INDEX_TYPE {index_type!r}; expected one of {INDEX_TYPES}")
+    dim = vectors.shape[1]
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "hnsw":
+        return faiss.IndexHNSWFlat(dim, FAISS_HNSW_M)
+
+    nlist = _nlist_for(len(vectors))
+    if index_type == "ivf":
+        index = faiss.index_factory(dim, f"IVF{nlist},Flat")
+    else:
+        pq_m = FAISS_PQ_M if dim % FAISS_PQ_M == 0 else 8
+        # 8-bit PQ codebooks need at least 256 training points
+        nbits = 8 if len(vectors) >= 256 else max(1, int(math.log2(len(vectors))))
+        index = faiss.index_factory(dim, f"IVF{nlist},PQ{pq_m}x{nbits}")
+        # Polysemous codes are only used for Hamming pre-filtering we never enable,
+        # and their training dominates build time
+        index.do_polysemous_training = False
+
+    train = vectors
+    if len(train) > 256 * nlist:
+        rng = np.random.default_rng(0)
+        train = vectors[np.sort(rng.choice(len(vectors), 256 * nlist, replace=False))]
+    index.train(np.ascontiguousarray(train, dtype=np.float32))
+    return index
+
+
+def configure_search(index):
+    """Applies the configured search-time parameters (nprobe / efSearch)."""
+    import faiss
+
+    try:
+        faiss.extract_index_ivf(index).nprobe = FAISS_IVF_NPROBE
+    except (RuntimeError, TypeError):
+        pass
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = FAISS_HNSW_EF_SEARCH
+    return index
+
+
+def search_params(index, positions: np.ndarray = None):
+    """
+    Per-call search parameters that restrict the search to the given index positions
+    (None = no restriction), carrying the configured nprobe / efSearch.
+    """
+    import faiss
+
+    if positions is None:
+        return None
+    selector = faiss.IDSelectorBatch(np.asarray(positions, dtype=np.int64))
+    try:
+        faiss.extract_index_ivf(index)
+        return faiss.SearchParametersIVF(sel=selector, nprobe=FAISS_IVF_NPROBE)
+    except (RuntimeError, TypeError):
+        pass
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=FAISS_HNSW_EF_SEARCH)
+    return faiss.SearchParameters(sel=selector)
+
+
+def build_store(texts, metadatas, ids, embeddings, index_type: str = FAISS_INDEX_TYPE):
+    """
+    Embeds the texts and builds a LangChain FAISS store backed by the chosen index type.
+    Returns (store, vectors) so callers can reuse the vectors for reporting.
+    """
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    return build_store_from_vectors(vectors, texts, metadatas, ids, embeddings, index_type), vectors
+
+
+def build_store_from_vectors(vectors, texts, metadatas, ids, embeddings,
+                             index_type: str = FAISS_INDEX_TYPE, batch_size: int = 65536):
+    """
+    Builds a LangChain FAISS store over precomputed vectors (an array or a memmap),
+    training the index over all of them and adding them `batch_size` rows at a time.
+    """
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    index = configure_search(create_index(index_type, vectors))
+    for start in range(0, len(vectors), batch_size):
+        index.add(np.ascontiguousarray(vectors[start:start + batch_size], dtype=np.float32))
+    docstore = InMemoryDocstore({
+        doc_id: Document(page_content=text, metadata=meta, id=doc_id)
+        for doc_id, text, meta in zip(ids, texts, metadatas)
+    })
+    return FAISS(embeddings, index, docstore, dict(enumerate(ids)))
+
+
+def load_store(vs_dir: str, embeddings, mmap: bool = FAISS_MMAP):
+    """
+    Opens a saved store. With mmap=True the index data is memory-mapped read-only
+    instead of copied into RAM; use mmap=False when the index will be modified.
+    """
+    import faiss
+
+    from langchain_community.vectorstores import FAISS
+
+    index_path = os.path.join(vs_dir, "index.faiss")
+    index = None
+    if mmap:
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+        try:
+            index = faiss.read_index(index_path, flags)
+        except RuntimeError as e:
+            logger.warning("Memory-mapped load failed (%s); loading into RAM", e)
+    if index is None:
+        index = faiss.read_index(index_path)
+
+    with open(os.path.join(vs_dir, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, configure_search(index), docstore, index_to_docstore_id)
+
+
+def measure_search_latency(index, queries: np.ndarray, k: int = RAG_TOP_K) -> dict:
+    """Per-query search latency in milliseconds (p50 / p95 / mean)."""
+    if len(queries) == 0 or index.ntotal == 0:
+        return {"queries": 0}
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q.reshape(1, -1), k)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings = np.asarray(timings)
+    return {
+        "queries": len(timings),
+        "p50_ms": round(float(np.percentile(timings, 50)), 4),
+        "p95_ms": round(float(np.percentile(timings, 95)), 4),
+        "mean_ms": round(float(timings.mean()), 4),
+    }
+
+
+def index_report(index, index_type: str, queries: np.ndarray, index_path: str = None) -> dict:
+    """Size and search-latency summary for one index."""
+    import faiss
+
+    if index_path and os.path.exists(index_path):
+        size = os.path.getsize(index_path)
+    else:
+        size = int(faiss.serialize_index(index).nbytes)
+    return {
+        "index_type": index_type,
+        "vectors": int(index.ntotal),
+        "size_bytes": size,
+        "search": measure_search_latency(index, queries),
+    }
+
+
+def compare_index_types(vectors: np.ndarray, n_queries: int = 200, k: int = RAG_TOP_K) -> list:
+    """
+    Builds every index type in memory over the same vectors and reports size,
+    build time, search latency and recall@k against exact search.
+    """
+    rng = np.random.default_rng(0)
+    queries = vectors[rng.choice(len(vectors), min(n_queries, len(vectors)), replace=False)]
+    exact = None
+    reports = []
+    for index_type in INDEX_TYPES:
+        start = time.perf_counter()
+        index = configure_search(create_index(index_type, vectors))
+        index.add(vectors)
+        build_s = time.perf_counter() - start
+
+        _, found = index.search(queries, k)
+        if exact is None:
+            exact = found
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(found, exact)])
+
+        report = index_report(index, index_type, queries)
+        report.update({"build_s": round(build_s, 3), f"recall@{k}": round(float(recall), 4)})
+        reports.append(report)
+    return reports
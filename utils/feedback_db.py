@@ -1,7 +1,31 @@
 # utils/feedback_db.py
+"""
+Feedback storage in a local SQLite database (data/feedback.db).
+
+Writes go through a write-behind queue: store_feedback_db() only enqueues the row,
+and one background writer thread owns a long-lived WAL-mode connection and inserts
+queued rows in batches (one transaction, one fsync per batch). Readers use their
+own long-lived per-thread connections, which WAL lets run alongside the writer.
+The schema is versioned with PRAGMA user_version and migrated once per process.
+
+Analytics read per-hour and per-day counts by feedback label from rollup tables
+that the writer updates in the same transaction as the inserts, so window
+statistics cost O(buckets) instead of a scan of the feedback history.
+"""
 import sqlite3
 import datetime
 import os
+import queue
+import atexit
+import threading
+from collections import Counter
+
+from config.constants import (
+    FEEDBACK_BATCH_SIZE, FEEDBACK_FLUSH_INTERVAL, FEEDBACK_QUEUE_MAX, SQLITE_BUSY_TIMEOUT,
+)
+from utils.logger import get_logger
+
+logger = get_logger("feedback_db")
 
 # Define database file path inside /data folder
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -9,49 +33,286 @@ DB_PATH = os.path.join(BASE_DIR, "data", "feedback.db")
 
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
-def _ensure_table_exists():
+# Schema migrations; MIGRATIONS[n] upgrades user_version n -> n + 1
+MIGRATIONS = [
     """
-    Ensures the feedback table exists before any read/write operation.
+    CREATE TABLE IF NOT EXISTS feedback (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT,
+        question TEXT,
+        answer TEXT,
+        feedback TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON feedback (timestamp);
+    CREATE INDEX IF NOT EXISTS idx_feedback_label ON feedback (feedback, timestamp);
+    """,
+    # Rollups: hourly buckets are "YYYY-MM-DDTHH", daily buckets "YYYY-MM-DD" (local time,
+    # like the row timestamps); existing rows are backfilled once
     """
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS feedback (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            question TEXT,
-            answer TEXT,
-            feedback TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
+    CREATE TABLE IF NOT EXISTS feedback_rollup_hourly (
+        bucket TEXT NOT NULL,
+        feedback TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (bucket, feedback)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS feedback_rollup_daily (
+        bucket TEXT NOT NULL,
+        feedback TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (bucket, feedback)
+    ) WITHOUT ROWID;
+    INSERT INTO feedback_rollup_hourly (bucket, feedback, count)
+        SELECT substr(timestamp, 1, 13), COALESCE(feedback, ''), COUNT(*)
+        FROM feedback WHERE timestamp IS NOT NULL GROUP BY 1, 2;
+    INSERT INTO feedback_rollup_daily (bucket, feedback, count)
+        SELECT substr(timestamp, 1, 10), COALESCE(feedback, ''), COUNT(*)
+        FROM feedback WHERE timestamp IS NOT NULL GROUP BY 1, 2;
+    """,
+]
+
+POSITIVE_LABEL = "Correct"
+
+_INSERT_SQL = "INSERT INTO feedback (timestamp, question, answer, feedback) VALUES (?, ?, ?, ?)"
+_ROLLUP_SQL = (
+    "INSERT INTO feedback_rollup_{table} (bucket, feedback, count) VALUES (?, ?, ?) "
+    "ON CONFLICT (bucket, feedback) DO UPDATE SET count = count + excluded.count"
+)
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # In WAL mode NORMAL only syncs at checkpoints; a crash can lose the last
+    # transactions but never corrupts the database
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _migrate(conn: sqlite3.Connection):
+    """Applies pending schema migrations, each in its own transaction."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target in range(version, len(MIGRATIONS)):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Another process may have migrated while we waited for the lock
+            if conn.execute("PRAGMA user_version").fetchone()[0] > target:
+                conn.execute("ROLLBACK")
+                continue
+            for statement in MIGRATIONS[target].split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target + 1}")
+            conn.execute("COMMIT")
+            logger.info("Feedback DB migrated to schema version %d", target + 1)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class _FeedbackWriter:
+    """
+    Owns the write connection and the batching thread for one database file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.queue = queue.Queue(maxsize=FEEDBACK_QUEUE_MAX)
+        self.conn = _connect(path)
+        self.conn.isolation_level = None        # explicit transactions only
+        _migrate(self.conn)
+        self._pending = 0                       # queued rows not yet committed
+        self._idle = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not (self._stop.is_set() and self.queue.empty()):
+            try:
+                batch = [self.queue.get(timeout=FEEDBACK_FLUSH_INTERVAL)]
+            except queue.Empty:
+                continue
+            # Collect whatever else arrived, up to one batch
+            while len(batch) < FEEDBACK_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error("❌ Dropped %d feedback rows: %s", len(batch), e)
+            finally:
+                with self._idle:
+                    self._pending -= len(batch)
+                    self._idle.notify_all()
+
+    def _write(self, rows):
+        hourly = Counter((ts[:13], label or "") for ts, _, _, label in rows)
+        daily = Counter((ts[:10], label or "") for ts, _, _, label in rows)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(_INSERT_SQL, rows)
+            self.conn.executemany(_ROLLUP_SQL.format(table="hourly"),
+                                  [(b, label, n) for (b, label), n in hourly.items()])
+            self.conn.executemany(_ROLLUP_SQL.format(table="daily"),
+                                  [(b, label, n) for (b, label), n in daily.items()])
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def put(self, row):
+        with self._idle:
+            self._pending += 1
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            # Back-pressure only when the writer is far behind; never block the UI for long
+            try:
+                self.queue.put(row, timeout=0.5)
+            except queue.Full:
+                with self._idle:
+                    self._pending -= 1
+                    self._idle.notify_all()
+                logger.error("❌ Feedback queue full; dropping feedback row")
+
+    def flush(self, timeout: float = None) -> bool:
+        """Waits until every queued row is committed. Returns False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.conn.close()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+_readers = threading.local()
+
+
+def _get_writer() -> _FeedbackWriter:
+    global _writer
+    if _writer is None or _writer.path != DB_PATH:
+        with _writer_lock:
+            if _writer is None or _writer.path != DB_PATH:
+                if _writer is not None:
+                    _writer.close()
+                _writer = _FeedbackWriter(DB_PATH)
+    return _writer
+
+
+def _reader() -> sqlite3.Connection:
+    """Long-lived read connection for the calling thread (one per Streamlit session thread)."""
+    writer = _get_writer()      # ensures the schema is migrated
+    conn = getattr(_readers, "conn", None)
+    if conn is None or _readers.path != writer.path:
+        if conn is not None:
+            conn.close()
+        conn = _readers.conn = _connect(writer.path)
+        _readers.path = writer.path
+    return conn
 
 
 def store_feedback_db(question: str, answer: str, feedback: str):
     """
     Store chatbot feedback in a local SQLite database.
+    The row is queued and committed by the background writer, so this returns immediately.
     """
-    _ensure_table_exists()
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO feedback (timestamp, question, answer, feedback) VALUES (?, ?, ?, ?)",
-        (datetime.datetime.now().isoformat(), question, answer, feedback)
-    )
-    conn.commit()
-    conn.close()
+    _get_writer().put((datetime.datetime.now().isoformat(), question, answer, feedback))
+
+
+def flush(timeout: float = None) -> bool:
+    """Blocks until queued feedback is committed (or `timeout` seconds pass)."""
+    if _writer is None:
+        return True
+    return _writer.flush(timeout)
+
+
+def close():
+    """Commits queued feedback and closes the write connection."""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+
+atexit.register(close)
 
 
 def get_feedback_entries(limit: int = 25):
     """
     Retrieve recent feedback entries for analytics display.
-    If the database or table is missing, it will auto-create and return [].
-    """
-    _ensure_table_exists()
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT timestamp, question, feedback FROM feedback ORDER BY id DESC LIMIT ?", (limit,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
\ No newline at end of file
+    Feedback still in the write queue is committed first (waiting at most briefly).
+    """
+    flush(timeout=FEEDBACK_FLUSH_INTERVAL * 2)
+    c = _reader().execute(
+        "SELECT timestamp, question, feedback FROM feedback ORDER BY id DESC LIMIT ?", (limit,)
+    )
+    return c.fetchall()
+
+
+def _label_counts(conn, table: str, start: str = None, end: str = None) -> Counter:
+    sql = f"SELECT feedback, SUM(count) FROM feedback_rollup_{table}"
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("bucket >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("bucket < ?")
+        params.append(end)
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    return Counter(dict(conn.execute(sql + " GROUP BY feedback", params).fetchall()))
+
+
+def get_feedback_stats(start: datetime.datetime = None, end: datetime.datetime = None) -> dict:
+    """
+    Feedback counts by label and accuracy (share of "Correct") for [start, end),
+    read from the rollups with hour resolution. Whole days inside the window come
+    from the daily rollup and only the partial days at its edges from the hourly
+    one. None means unbounded on that side.
+    Returns {"total", "by_label", "correct", "accuracy"} (accuracy in percent, or None).
+    """
+    flush(timeout=FEEDBACK_FLUSH_INTERVAL * 2)
+    conn = _reader()
+
+    def hour(dt, round_up=False):
+        floored = dt.replace(minute=0, second=0, microsecond=0)
+        return floored + datetime.timedelta(hours=1) if round_up and floored != dt else floored
+
+    start_h = hour(start) if start is not None else None
+    end_h = hour(end, round_up=True) if end is not None else None
+
+    # First and last midnight inside the window
+    if start_h is None:
+        first_day = None
+    else:
+        first_day = start_h.replace(hour=0)
+        if first_day != start_h:
+            first_day += datetime.timedelta(days=1)
+    last_day = end_h.replace(hour=0) if end_h is not None else None
+
+    fmt_h = lambda dt: dt.strftime("%Y-%m-%dT%H") if dt is not None else None
+    if first_day is not None and last_day is not None and first_day >= last_day:
+        counts = _label_counts(conn, "hourly", fmt_h(start_h), fmt_h(end_h))
+    else:
+        counts = _label_counts(conn, "daily",
+                               first_day.strftime("%Y-%m-%d") if first_day else None,
+                               last_day.strftime("%Y-%m-%d") if last_day else None)
+        if start_h is not None and start_h != first_day:
+            counts += _label_counts(conn, "hourly", fmt_h(start_h), fmt_h(first_day))
+        if end_h is not None and end_h != last_day:
+            counts += _label_counts(conn, "hourly", fmt_h(last_day), fmt_h(end_h))
+
+    total = sum(counts.values())
+    correct = counts.get(POSITIVE_LABEL, 0)
+    return {
+        "total": total,
+        "by_label": dict(counts),
+        "correct": correct,
+        "accuracy": round(correct / total * 100, 1) if total else None,
+    }
@@ -0,0 +1,163 @@
+"""
+Shared, pooled HTTP client for every outbound integration
+(Open-Meteo, Serper, knowledge-base downloads).
+
+One requests.Session with keep-alive connection pools is reused process-wide, so
+repeat calls to a host skip the TCP + TLS handshake. Every request gets connect/read
+timeouts and bounded retries with exponential backoff plus jitter, and per-host
+request counts, errors, latency and opened connections are tracked.
+
+Inside `with deadline(at):` (used by the per-request context stages) requests are
+sent without retries and their timeouts are clamped to the time left, so a hanging
+upstream releases the calling thread when the stage's deadline passes.
+"""
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config.constants import (
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_RETRIES, HTTP_BACKOFF_FACTOR,
+    HTTP_BACKOFF_JITTER, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE,
+)
+
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+_session = None
+_no_retry_session = None
+_session_lock = threading.Lock()
+_deadline = contextvars.ContextVar("http_deadline", default=None)
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _build_session(retries: int = HTTP_MAX_RETRIES) -> requests.Session:
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        backoff_jitter=HTTP_BACKOFF_JITTER,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Returns the process-wide pooled session."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def _get_no_retry_session() -> requests.Session:
+    global _no_retry_session
+    if _no_retry_session is None:
+        with _session_lock:
+            if _no_retry_session is None:
+                _no_retry_session = _build_session(retries=0)
+    return _no_retry_session
+
+
+@contextmanager
+def deadline(at: float):
+    """
+    Requests sent in this block (same thread / context) must finish by `at`
+    (time.monotonic() seconds): no retries, and timeouts clamped to the time left.
+    """
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _record(host: str, elapsed_ms: float, error: bool):
+    with _stats_lock:
+        s = _stats.setdefault(host, {"requests": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        s["requests"] += 1
+        s["errors"] += int(error)
+        s["total_ms"] += elapsed_ms
+        s["max_ms"] = max(s["max_ms"], elapsed_ms)
+
+
+def request(method: str, url: str, timeout=DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+    """
+    Sends a request through the shared session. `timeout` is (connect, read) seconds.
+    Transport errors are raised after the configured retries; HTTP error statuses are
+    returned as-is (call raise_for_status() where needed). Under deadline() the request
+    is tried once within the remaining time.
+    """
+    host = urlsplit(url).netloc
+    session = get_session()
+    at = _deadline.get()
+    if at is not None:
+        remaining = at - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout(f"Deadline passed before request to {host}")
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        timeout = (min(connect, remaining), min(read, remaining))
+        session = _get_no_retry_session()
+    start = time.perf_counter()
+    error = True
+    try:
+        response = session.request(method, url, timeout=timeout, **kwargs)
+        error = response.status_code >= 400
+        return response
+    finally:
+        _record(host, (time.perf_counter() - start) * 1000, error)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def get_http_stats() -> dict:
+    """
+    Per-host counters: requests, errors, mean/max latency (ms) and connections
+    opened by the pool (fewer connections than requests means keep-alive reuse).
+    """
+    pools = {}
+    for session in (_session, _no_retry_session):
+        if session is None:
+            continue
+        for adapter in set(session.adapters.values()):
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is not None:
+                    netloc = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+                    pools[netloc] = pools.get(netloc, 0) + pool.num_connections
+
+    with _stats_lock:
+        out = {}
+        for host, s in _stats.items():
+            out[host] = {
+                "requests": s["requests"],
+                "errors": s["errors"],
+                "mean_ms": round(s["total_ms"] / s["requests"], 1) if s["requests"] else 0.0,
+                "max_ms": round(s["max_ms"], 1),
+                "connections_opened": pools.get(host, 0),
+            }
+        return out
@@ -0,0 +1,58 @@
+"""
+Provenance of knowledge-base files, derived from the file naming convention
+
+    <collection>_<title words>[_<year>].txt     e.g. icar_crida_vulnerability_atlas_2020.txt
+
+The collection (publisher / series) decides which index shard a file's chunks
+live in; the year, when present, lets queries target one edition of a report.
+"""
+import os
+import re
+
+_YEAR_RE = re.compile(r"(?:^|_)((?:19|20)\d{2})(?=_|$)")
+
+
+def collection_for(filename: str) -> str:
+    """Index shard name for a knowledge-base file (its first name token, lower-cased)."""
+    stem = os.path.splitext(os.path.basename(filename))[0].lower()
+    return stem.split("_", 1)[0] or "default"
+
+
+def year_for(filename: str):
+    """Publication year from the file name, or None."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    match = _YEAR_RE.search(stem)
+    return int(match.group(1)) if match else None
+
+
+def describe_source(filename: str) -> dict:
+    """Chunk metadata shared by every chunk of one file."""
+    return {"source": filename, "collection": collection_for(filename), "year": year_for(filename)}
+
+
+def pages_label(first, last):
+    """"12" or "12-13" for a page range, None if the text has no pages."""
+    if first is None:
+        return None
+    return str(first) if first == last else f"{first}-{last}"
+
+
+def matches(filename: str, filters: dict = None) -> bool:
+    """
+    True if the file passes the filters: {"collection", "source", "year"}, each a single
+    value or a list of accepted values. Missing keys do not filter.
+    """
+    if not filters:
+        return True
+    info = describe_source(filename)
+    for key in ("collection", "source", "year"):
+        wanted = filters.get(key)
+        if wanted is None:
+            continue
+        if not isinstance(wanted, (list, tuple, set, frozenset)):
+            wanted = [wanted]
+        if key == "year":
+            wanted = {int(w) for w in wanted}
+        if info[key] not in wanted:
+            return False
+    return True
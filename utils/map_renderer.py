@@ -0,0 +1,164 @@
+"""
+Synthetic climate map rendering (temporary diffusion model placeholder).
+
+The map is computed as NumPy arrays: the vertical gradient is a broadcast over
+rows and every cluster fills its bounding box from a distance field, instead of
+hundreds of line and ellipse draw calls. The field is computed at a small fixed
+size (FIELD_SIZE) and bilinearly upscaled, which both smooths it (replacing a
+full-image blur) and keeps the cost nearly independent of the output size; grid
+lines and the title are drawn at full size. The random layout is seeded from the
+(rounded) coordinates, so a location always gets the same map, and the encoded
+PNG is cached per location and size. The original draw-call renderer lives in
+benchmarks/legacy_map.py.
+
+render_weather_grid() draws a real field instead: a live temperature or precipitation
+grid from utils/weather_grid.py, interpolated to the image size and colour-mapped.
+"""
+import io
+import math
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from config.constants import MAP_CACHE_SIZE, MAP_LOC_DECIMALS
+
+BASE_COLOR = (180, 210, 255)            # light sky tone
+GRADIENT_FALLOFF = (0.3, 0.5, 0.7)      # per-channel darkening from top to bottom
+GRID_COLOR = (220, 220, 220)
+GRID_STEP = 64
+N_CLUSTERS = 10
+FIELD_SIZE = (256, 160)                 # largest cluster-field size before upscaling
+
+# Colour ramps for the live weather layers (low -> high)
+GRID_RAMPS = {
+    "temperature_2m": [(49, 54, 149), (116, 173, 209), (255, 255, 191), (244, 109, 67), (165, 0, 38)],
+    "precipitation": [(247, 251, 255), (198, 219, 239), (107, 174, 214), (33, 113, 181), (8, 48, 107)],
+}
+
+
+def _seed(lat: float, lon: float) -> int:
+    key = f"{round(lat, MAP_LOC_DECIMALS)},{round(lon, MAP_LOC_DECIMALS)}".encode()
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "little")
+
+
+def _render_field(lat: float, lon: float, width: int, height: int) -> np.ndarray:
+    """Gradient base plus rain/heat clusters as a (height, width, 3) uint8 array."""
+    rng = np.random.default_rng(_seed(lat, lon))
+    scale = min(width / 512, height / 320)
+
+    # --- Rainfall/heat zones: a pixel inside a cluster takes the colour of the smallest
+    # concentric ring covering it (fill * ring / radius) and later clusters paint over
+    # earlier ones. Clusters only write a 2-D ring code; colours are gathered once at the end.
+    margin_x, margin_y = int(100 * scale), int(60 * scale)
+    max_radius = max(int(100 * scale), 1)
+    stride = max_radius + 1                       # ring codes per cluster
+    codes = np.full((height, width), -1, np.int32)
+    palette = np.zeros((N_CLUSTERS * stride, 3), np.uint8)
+    for k in range(N_CLUSTERS):
+        cx = int(rng.integers(margin_x, max(width - margin_x, margin_x + 1)))
+        cy = int(rng.integers(margin_y, max(height - margin_y, margin_y + 1)))
+        radius = max(int(rng.integers(40, 101) * scale), 1)
+        if rng.random() < 0.6:
+            fill = (rng.integers(0, 81), rng.integers(100, 181), rng.integers(200, 256))   # rain
+        else:
+            fill = (rng.integers(200, 256), rng.integers(100, 151), rng.integers(60, 81))  # heat
+        rings = np.arange(radius + 1, dtype=np.float32)
+        rings[0] = 1
+        palette[k * stride:k * stride + radius + 1] = rings[:, None] * (1 / radius) * np.asarray(fill, np.float32)
+
+        y0, y1 = max(cy - radius, 0), min(cy + radius + 1, height)
+        x0, x1 = max(cx - radius, 0), min(cx + radius + 1, width)
+        dy = np.arange(y0 - cy, y1 - cy, dtype=np.float32)[:, None]
+        dx = np.arange(x0 - cx, x1 - cx, dtype=np.float32)[None, :]
+        ring = np.ceil(np.sqrt(dx * dx + dy * dy)).astype(np.int32)
+        np.copyto(codes[y0:y1, x0:x1], ring + k * stride, where=ring <= radius)
+
+    # --- Layered gradient base (one row of colours broadcast across the width) under the zones
+    factor = np.arange(height, dtype=np.float32)[:, None] / height
+    rows = np.asarray(BASE_COLOR, np.float32) * (1 - np.asarray(GRADIENT_FALLOFF, np.float32) * factor)
+    covered = codes >= 0
+    img = palette.take(np.where(covered, codes, 0), axis=0)
+    np.copyto(img, rows.astype(np.uint8)[:, None, :], where=~covered[:, :, None])
+    return img
+
+
+def generate_downscaled_map(lat, lon, width: int = 512, height: int = 320):
+    """
+    Context-aware synthetic climate map generator.
+    Generates regional-like rainfall or heat intensity maps using smooth gradients and
+    clusters; the same coordinates always produce the same map.
+    """
+    # --- Cluster field at (at most) FIELD_SIZE; the bilinear upscale smooths it
+    factor = max(2, math.ceil(max(width / FIELD_SIZE[0], height / FIELD_SIZE[1])))
+    field = _render_field(lat, lon, max(width // factor, 1), max(height // factor, 1))
+    img = Image.fromarray(field, "RGB").resize((width, height), Image.BILINEAR)
+    draw = ImageDraw.Draw(img)
+
+    # --- Topographic grid lines
+    for x in range(0, width, GRID_STEP):
+        draw.line([(x, 0), (x, height)], fill=GRID_COLOR)
+    for y in range(0, height, GRID_STEP):
+        draw.line([(0, y), (width, y)], fill=GRID_COLOR)
+
+    # --- Add title & coordinate overlay
+    draw.rectangle([(10, 10), (width - 10, 55)], fill=(255, 255, 255))
+    draw.text((20, 18), f"Synthetic Climate Map\nLat {lat:.2f}, Lon {lon:.2f}", fill=(50, 50, 50))
+    return img
+
+
+@lru_cache(maxsize=MAP_CACHE_SIZE)
+def _cached_png(lat: float, lon: float, width: int, height: int) -> bytes:
+    buf = io.BytesIO()
+    generate_downscaled_map(lat, lon, width, height).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def render_map_png(lat, lon, width: int = 512, height: int = 320) -> bytes:
+    """Encoded PNG of generate_downscaled_map, cached per rounded location and size."""
+    return _cached_png(round(lat, MAP_LOC_DECIMALS), round(lon, MAP_LOC_DECIMALS), width, height)
+
+
+def _colorize(field: np.ndarray, ramp, vmin: float, vmax: float) -> np.ndarray:
+    """Maps a 2-D field onto a colour ramp; returns a (h, w, 3) uint8 array."""
+    t = np.clip((field - vmin) / max(vmax - vmin, 1e-6), 0, 1)
+    stops = np.linspace(0, 1, len(ramp))
+    ramp = np.asarray(ramp, np.float32)
+    return np.stack([np.interp(t, stops, ramp[:, c]) for c in range(3)], axis=-1).astype(np.uint8)
+
+
+def render_weather_grid(grid: dict, lat: float = None, lon: float = None,
+                        width: int = 512, height: int = 320):
+    """
+    Renders a grid from utils.weather_grid.fetch_weather_grid as a colour-mapped field
+    (north up), bilinearly interpolated between grid points, with the selected point marked.
+    """
+    values = np.asarray(grid["values"], np.float32)
+    if not np.isfinite(values).any():
+        raise ValueError("Weather grid has no values")
+    values = np.where(np.isfinite(values), values, np.nanmean(values))
+    field = Image.fromarray(np.ascontiguousarray(values[::-1]), "F").resize((width, height), Image.BILINEAR)
+    field = np.asarray(field)
+
+    variable = grid["variable"]
+    vmin, vmax = float(values.min()), float(values.max())
+    if variable == "precipitation":
+        vmin, vmax = 0.0, max(vmax, 1.0)    # dry stays white
+    img = Image.fromarray(_colorize(field, GRID_RAMPS.get(variable, GRID_RAMPS["temperature_2m"]),
+                                    vmin, vmax), "RGB")
+    draw = ImageDraw.Draw(img)
+
+    # --- Mark the selected point
+    lats, lons = grid["lats"], grid["lons"]
+    if lat is not None and lon is not None and len(lats) > 1 and len(lons) > 1:
+        x = (lon - lons[0]) / (lons[-1] - lons[0]) * (width - 1)
+        y = (lats[-1] - lat) / (lats[-1] - lats[0]) * (height - 1)
+        draw.ellipse([(x - 5, y - 5), (x + 5, y + 5)], outline=(20, 20, 20), width=2)
+
+    # --- Title & legend overlay
+    draw.rectangle([(10, 10), (width - 10, 55)], fill=(255, 255, 255))
+    draw.text((20, 18), f"Live {variable} ({grid['units']}) {grid.get('time') or ''}\n"
+                        f"min {float(values.min()):.1f}  max {float(values.max()):.1f}  "
+                        f"{len(lats)}x{len(lons)} points", fill=(50, 50, 50))
+    return img
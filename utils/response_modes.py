@@ -1,10 +1,12 @@
 """
 Formatter for concise vs detailed responses.
 """
-def format_response(raw_text: str, mode: str = "concise", max_chars_concise: int = 300):
+CONCISE_MAX_CHARS = 300
+
+def format_response(raw_text: str, mode: str = "concise", max_chars_concise: int = CONCISE_MAX_CHARS):
     if mode == "concise":
         if len(raw_text) <= max_chars_concise:
             return raw_text
         return raw_text[:max_chars_concise].rsplit(".", 1)[0] + "..."
     else:
-        return raw_text
\ No newline at end of file
+        return raw_text
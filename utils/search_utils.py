@@ -3,8 +3,8 @@ Simple web search utility using duckduckgo_search as fallback.
 """
 from duckduckgo_search import ddg_answers, ddg
 from typing import List
-import requests
 import os
+from utils import http_client
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -16,7 +16,7 @@ def serper_search(q, max_results=5):
     url = "https://google.serper.dev/search"
     headers = {"X-API-KEY": SERPER_KEY, "Content-Type": "application/json"}
     try:
-        r = requests.post(url, headers=headers, json={"q": q, "num": max_results}, timeout=10)
+        r = http_client.post(url, headers=headers, json={"q": q, "num": max_results})
         r.raise_for_status()
         return r.json()
     except Exception as e:
@@ -0,0 +1,55 @@
+"""
+LangChain callback that records the token usage of LLM calls onto tracing spans.
+Kept out of utils/tracing.py so that modules which only open spans (weather,
+retrieval, the app start-up path) do not import LangChain.
+"""
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class TokenUsage(BaseCallbackHandler):
+    """
+    LangChain callback that captures token usage of one LLM call. Uses the usage the
+    provider reports; if none is reported, both counts are estimated at ~4 characters
+    per token and `estimated` is set.
+    """
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.estimated = False
+        self._prompt_chars = 0
+        self._ended = False
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._prompt_chars = sum(len(str(m.content)) for batch in messages for m in batch)
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._prompt_chars = sum(len(p) for p in prompts)
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt, completion = usage.get("prompt_tokens"), usage.get("completion_tokens")
+        text = ""
+        for generations in response.generations:
+            for g in generations:
+                text += g.text
+                metadata = getattr(getattr(g, "message", None), "usage_metadata", None)
+                if metadata and prompt is None:
+                    prompt, completion = metadata.get("input_tokens"), metadata.get("output_tokens")
+        self._ended = True
+        if prompt is None:
+            self.estimated = True
+            prompt, completion = self._prompt_chars // 4, len(text) // 4
+        self.prompt_tokens += prompt or 0
+        self.completion_tokens += completion or 0
+
+    def attach(self, s, completion_text: str = None):
+        """
+        Copies the counts onto a span. For a stream closed before the model finished,
+        pass the text received so far and the counts are estimated from it.
+        """
+        if not self._ended and completion_text is not None:
+            self.estimated = True
+            self.prompt_tokens, self.completion_tokens = self._prompt_chars // 4, len(completion_text) // 4
+        s.set(prompt_tokens=self.prompt_tokens, completion_tokens=self.completion_tokens,
+              tokens_estimated=self.estimated)
@@ -0,0 +1,360 @@
+"""
+Lightweight per-request tracing for the answer pipeline.
+
+A trace is opened per request (answer_query / answer_query_stream) and nested spans
+are recorded around each stage: cache lookups, context gathering, retrieval, weather,
+web search and every LLM call (with prompt / completion token counts). The active
+trace and span live in context variables, so work submitted to thread pools through
+`contextvars.copy_context().run` is attributed to the right request.
+
+Finished traces are
+  - returned to the caller (meta["trace"]),
+  - aggregated into process-wide latency histograms and token counters, exported in
+    Prometheus text format (render_prometheus() / TRACE_METRICS_FILE),
+  - written to a local JSONL trace store when slow (>= TRACE_SLOW_MS) or sampled
+    (TRACE_SAMPLE_RATE of the rest), by a background writer thread.
+Token counts are captured by utils/token_usage.TokenUsage, kept separate so that
+importing this module does not load LangChain.
+"""
+import os
+import json
+import time
+import uuid
+import queue
+import random
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from config.constants import (
+    TRACE_DIR, TRACE_SLOW_MS, TRACE_SAMPLE_RATE, TRACE_STORE_MAX_BYTES,
+    TRACE_METRICS_INTERVAL, TRACE_HISTOGRAM_BUCKETS,
+)
+from utils.logger import get_logger
+
+logger = get_logger("tracing")
+
+TRACE_STORE_FILE = os.path.join(TRACE_DIR, "traces.jsonl")
+TRACE_METRICS_FILE = os.path.join(TRACE_DIR, "metrics.prom")
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_current_span = contextvars.ContextVar("span", default=None)
+
+
+class Span:
+    """One timed stage of a trace; `set()` attaches attributes (e.g. token counts)."""
+
+    __slots__ = ("trace", "span_id", "name", "parent", "start", "duration_ms", "status", "attrs")
+
+    def __init__(self, trace, name: str, parent, attrs: dict):
+        self.trace = trace
+        self.span_id = trace.next_span_id()
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.status = "ok"
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.span_id,
+            "parent": self.parent,
+            "name": self.name,
+            "start_ms": round((self.start - self.trace.start) * 1000, 2),
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            **self.attrs,
+        }
+
+
+class _NullSpan:
+    """Returned by span() outside of a trace; attributes are discarded."""
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """
+    Spans recorded for one request. Spans may finish on pool threads, so recording
+    is locked; spans that finish after the trace has ended (e.g. a context stage
+    that missed its deadline) are counted but not kept.
+    """
+
+    def __init__(self, name: str, attrs: dict):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.timestamp = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.status = "ok"
+        self.spans = []
+        self.late_spans = 0
+        self._lock = threading.Lock()
+        self._span_ids = 0
+
+    def next_span_id(self) -> int:
+        with self._lock:
+            self._span_ids += 1
+            return self._span_ids
+
+    def record(self, span: Span):
+        with self._lock:
+            if self.duration_ms is None:
+                self.spans.append(span)
+                return True
+            self.late_spans += 1
+            return False
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.start) * 1000, 2)
+
+    def tokens(self) -> dict:
+        """Prompt / completion tokens summed over all LLM spans."""
+        totals = {"prompt_tokens": 0, "completion_tokens": 0}
+        for s in self.spans:
+            for key in totals:
+                totals[key] += s.attrs.get(key, 0)
+        return totals
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            **self.attrs,
+            **self.tokens(),
+            "late_spans": self.late_spans,
+            "spans": [s.to_dict() for s in spans],
+        }
+
+
+def _reset(var, token):
+    # Generators may be closed from another context; fall back to clearing the var
+    try:
+        var.reset(token)
+    except ValueError:
+        var.set(None)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(name: str, **attrs):
+    """
+    Opens a trace for one request and makes it current. On exit the trace is
+    finished, aggregated into the metrics and (if slow or sampled) stored.
+    """
+    trace = Trace(name, attrs)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.status = "error" if isinstance(e, Exception) else "cancelled"
+        raise
+    finally:
+        _reset(_current_span, span_token)
+        _reset(_current_trace, trace_token)
+        with trace._lock:
+            trace.duration_ms = round((time.perf_counter() - trace.start) * 1000, 2)
+        _finish(trace)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Times a stage of the current trace, nested under the current span.
+    Outside of a trace it yields a no-op span and records nothing.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield _NULL_SPAN
+        return
+    parent = _current_span.get()
+    s = Span(trace, name, parent.span_id if parent is not None else None, attrs)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.status = "error" if isinstance(e, Exception) else "cancelled"
+        if isinstance(e, Exception):
+            s.attrs["error"] = str(e)[:200]
+        raise
+    finally:
+        _reset(_current_span, token)
+        s.duration_ms = round((time.perf_counter() - s.start) * 1000, 2)
+        trace.record(s)
+
+
+# ---------------------------------------------------------------- aggregation
+_metrics_lock = threading.Lock()
+_histograms = {}    # (trace name, span name) -> [bucket counts..., +Inf], sum, count
+_tokens = {}        # (span name, kind) -> total
+_counters = {"traces": {}, "stored": 0, "dropped": 0, "late_spans": 0}
+_last_metrics_write = 0.0
+
+
+def _observe(key, seconds: float):
+    h = _histograms.get(key)
+    if h is None:
+        h = _histograms[key] = {"buckets": [0] * (len(TRACE_HISTOGRAM_BUCKETS) + 1), "sum": 0.0, "count": 0}
+    for i, bound in enumerate(TRACE_HISTOGRAM_BUCKETS):
+        if seconds <= bound:
+            h["buckets"][i] += 1
+            break
+    else:
+        h["buckets"][-1] += 1
+    h["sum"] += seconds
+    h["count"] += 1
+
+
+def _finish(trace: Trace):
+    global _last_metrics_write
+    with _metrics_lock:
+        _observe((trace.name, trace.name), trace.duration_ms / 1000)
+        for s in trace.spans:
+            _observe((trace.name, s.name), s.duration_ms / 1000)
+            for kind in ("prompt_tokens", "completion_tokens"):
+                if s.attrs.get(kind):
+                    _tokens[(s.name, kind)] = _tokens.get((s.name, kind), 0) + s.attrs[kind]
+        status_key = (trace.name, trace.status)
+        _counters["traces"][status_key] = _counters["traces"].get(status_key, 0) + 1
+        _counters["late_spans"] += trace.late_spans
+        write_metrics = time.time() - _last_metrics_write >= TRACE_METRICS_INTERVAL
+        if write_metrics:
+            _last_metrics_write = time.time()
+
+    # Never block the request thread on the writer: drop (and count) when it falls behind
+    if trace.duration_ms >= TRACE_SLOW_MS or random.random() < TRACE_SAMPLE_RATE:
+        try:
+            _store_queue().put_nowait(trace.to_dict())
+        except queue.Full:
+            with _metrics_lock:
+                _counters["dropped"] += 1
+    if write_metrics:
+        try:
+            _store_queue().put_nowait(None)
+        except queue.Full:
+            pass    # the next interval refreshes the metrics file
+
+
+def render_prometheus() -> str:
+    """Current histograms and counters in the Prometheus text exposition format."""
+    lines = [
+        "# HELP climasense_stage_duration_seconds Latency of each traced pipeline stage.",
+        "# TYPE climasense_stage_duration_seconds histogram",
+    ]
+    with _metrics_lock:
+        for (trace_name, stage), h in sorted(_histograms.items()):
+            labels = f'trace="{trace_name}",stage="{stage}"'
+            cumulative = 0
+            for bound, n in zip(TRACE_HISTOGRAM_BUCKETS, h["buckets"]):
+                cumulative += n
+                lines.append(f'climasense_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'climasense_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {h["count"]}')
+            lines.append(f"climasense_stage_duration_seconds_sum{{{labels}}} {h['sum']:.6f}")
+            lines.append(f"climasense_stage_duration_seconds_count{{{labels}}} {h['count']}")
+
+        lines += ["# HELP climasense_llm_tokens_total LLM tokens by stage and kind.",
+                  "# TYPE climasense_llm_tokens_total counter"]
+        for (stage, kind), total in sorted(_tokens.items()):
+            lines.append(f'climasense_llm_tokens_total{{stage="{stage}",kind="{kind.split("_")[0]}"}} {total}')
+
+        lines += ["# HELP climasense_traces_total Finished request traces by status.",
+                  "# TYPE climasense_traces_total counter"]
+        for (name, status), n in sorted(_counters["traces"].items()):
+            lines.append(f'climasense_traces_total{{trace="{name}",status="{status}"}} {n}')
+
+        lines += ["# HELP climasense_traces_stored_total Traces written to the trace store.",
+                  "# TYPE climasense_traces_stored_total counter",
+                  f"climasense_traces_stored_total {_counters['stored']}",
+                  "# HELP climasense_traces_dropped_total Traces dropped because the store queue was full.",
+                  "# TYPE climasense_traces_dropped_total counter",
+                  f"climasense_traces_dropped_total {_counters['dropped']}",
+                  "# HELP climasense_late_spans_total Spans that finished after their trace.",
+                  "# TYPE climasense_late_spans_total counter",
+                  f"climasense_late_spans_total {_counters['late_spans']}"]
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------------------------------------------- trace store
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def _store_queue() -> queue.Queue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                os.makedirs(TRACE_DIR, exist_ok=True)
+                _queue = queue.Queue(maxsize=1000)
+                threading.Thread(target=_writer, name="trace-writer", daemon=True).start()
+    return _queue
+
+
+def _write_metrics_file():
+    tmp_path = TRACE_METRICS_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, TRACE_METRICS_FILE)
+
+
+def _writer():
+    """Appends stored traces (one JSON object per line) and refreshes the metrics file."""
+    while True:
+        item = _queue.get()
+        try:
+            if item is None:
+                _write_metrics_file()
+                continue
+            if os.path.exists(TRACE_STORE_FILE) and os.path.getsize(TRACE_STORE_FILE) > TRACE_STORE_MAX_BYTES:
+                os.replace(TRACE_STORE_FILE, TRACE_STORE_FILE + ".1")
+            with open(TRACE_STORE_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            with _metrics_lock:
+                _counters["stored"] += 1
+        except Exception as e:
+            logger.error("Trace store write failed: %s", e)
+
+
+def flush_metrics():
+    """Writes the Prometheus metrics file now (e.g. on shutdown or from a scraper hook)."""
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    _write_metrics_file()
+    return TRACE_METRICS_FILE
+
+
+def recent_traces(limit: int = 20, min_duration_ms: float = 0.0) -> list:
+    """Most recent stored traces, newest first, optionally only the slow ones."""
+    if not os.path.exists(TRACE_STORE_FILE):
+        return []
+    with open(TRACE_STORE_FILE, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    out = []
+    for line in reversed(lines):
+        try:
+            trace = json.loads(line)
+        except ValueError:
+            continue
+        if trace.get("duration_ms", 0) >= min_duration_ms:
+            out.append(trace)
+            if len(out) >= limit:
+                break
+    return out
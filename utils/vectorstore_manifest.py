@@ -0,0 +1,73 @@
+"""
+Manifest of file and chunk content hashes for incremental vectorstore builds.
+The manifest lives next to the FAISS index (data/vectorstore/versions/<version>/manifest.json) and records,
+for every knowledge-base file, its content hash and the ids of the chunks it produced.
+Chunk ids are content hashes, so unchanged chunks keep their id (and their vector).
+"""
+import os
+import json
+import hashlib
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Streams the file through sha256 without loading it fully into memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chunk_id_factory(source: str):
+    """
+    Returns a function that maps the successive chunk texts of one source file to
+    their ids, so ids can be assigned while chunks are streamed (see chunk_ids).
+    """
+    seen = {}
+
+    def next_id(text: str) -> str:
+        digest = hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()
+        n = seen.get(digest, 0)
+        seen[digest] = n + 1
+        return digest if n == 0 else f"{digest}-{n}"
+
+    return next_id
+
+
+def chunk_ids(source: str, chunks):
+    """
+    Content-derived ids for the chunks of one source file.
+    Identical chunks inside the same file get an ordinal suffix so ids stay unique.
+    """
+    next_id = chunk_id_factory(source)
+    return [next_id(text) for text in chunks]
+
+
+def new_manifest(**params) -> dict:
+    """Empty manifest tagged with the build parameters (chunking, embedding model)."""
+    return {"version": MANIFEST_VERSION, "params": params, "files": {}}
+
+
+def load_manifest(vs_dir: str):
+    """Returns the stored manifest, or None if missing/unreadable."""
+    path = os.path.join(vs_dir, MANIFEST_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(vs_dir: str, manifest: dict):
+    """Writes the manifest atomically so a crash never leaves a truncated file."""
+    path = os.path.join(vs_dir, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,143 @@
+"""
+Versioned vectorstore directories with an atomic "current" pointer.
+
+Layout under FAISS_INDEX_DIR (data/vectorstore):
+    versions/<version>/shards/<collection>/
+                            index.faiss, index.pkl, bm25.pkl, manifest.json, build_report.json
+    CURRENT                 name of the version readers should use
+
+Every knowledge-base collection (see utils/kb_catalog.py) is a separate index shard.
+
+A build writes into a private staging directory (a hard-linked copy of the current
+version, so incremental builds still apply only the delta and unchanged shards cost
+no I/O), renames it into versions/ and then
+replaces CURRENT with os.replace. Readers therefore only ever see complete indexes:
+they keep using the old version until the pointer moves. Older versions are pruned,
+keeping VECTORSTORE_KEEP_VERSIONS. A legacy flat layout (index files directly in
+FAISS_INDEX_DIR, or a single store at the version root) is still read as one
+shard until the first sharded build.
+"""
+import os
+import time
+import shutil
+
+from config.constants import VECTORSTORE_KEEP_VERSIONS
+from utils.logger import get_logger
+
+logger = get_logger("vectorstore_versions")
+
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+SHARDS_DIR = "shards"
+LEGACY_SHARD = "default"        # name of the single store of pre-shard layouts
+STAGING_SUFFIX = ".staging"
+STALE_STAGING_AGE = 24 * 3600   # seconds
+
+
+def current_version(root: str):
+    """Name of the published version, or None (no versioned build yet)."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return name if name and os.path.isdir(os.path.join(root, VERSIONS_DIR, name)) else None
+
+
+def current_dir(root: str) -> str:
+    """Directory holding the index files readers should load."""
+    name = current_version(root)
+    return os.path.join(root, VERSIONS_DIR, name) if name else root
+
+
+def shard_dirs(directory: str) -> dict:
+    """
+    {collection: directory} for the shards of a version directory. A pre-shard layout
+    (index files directly in `directory`) is one shard named LEGACY_SHARD.
+    """
+    shards_root = os.path.join(directory, SHARDS_DIR)
+    if os.path.isdir(shards_root):
+        return {name: os.path.join(shards_root, name) for name in sorted(os.listdir(shards_root))
+                if os.path.isdir(os.path.join(shards_root, name))}
+    if os.path.exists(os.path.join(directory, "index.faiss")):
+        return {LEGACY_SHARD: directory}
+    return {}
+
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:         # e.g. a filesystem without hard links
+        shutil.copy2(src, dst)
+
+
+def unshare(directory: str, *filenames: str):
+    """
+    Removes files that are about to be rewritten in place. Staged files are hard links
+    into the published version, so writing through them would modify that version.
+    """
+    for filename in filenames:
+        try:
+            os.remove(os.path.join(directory, filename))
+        except FileNotFoundError:
+            pass
+
+
+def stage_version(root: str) -> str:
+    """
+    Creates a private staging directory seeded with hard links to the current version's
+    files and returns its path. Files a build rewrites must be replaced (os.replace) or
+    unshare()d first, never written in place.
+    """
+    versions = os.path.join(root, VERSIONS_DIR)
+    os.makedirs(versions, exist_ok=True)
+    name = time.strftime("v%Y%m%d-%H%M%S") + f"-{os.getpid()}-{time.monotonic_ns() % 100000:05d}"
+    staging = os.path.join(versions, name + STAGING_SUFFIX)
+    source = current_dir(root)
+    os.makedirs(staging)
+    for filename in os.listdir(source):
+        path = os.path.join(source, filename)
+        if filename == SHARDS_DIR and source != root:
+            shutil.copytree(path, os.path.join(staging, SHARDS_DIR), copy_function=_link_or_copy)
+        elif os.path.isfile(path) and filename not in (CURRENT_FILE, ".timestamp"):
+            _link_or_copy(path, os.path.join(staging, filename))
+    return staging
+
+
+def publish(root: str, staging: str) -> str:
+    """Moves a finished staging directory into place and atomically points CURRENT at it."""
+    final = staging[: -len(STAGING_SUFFIX)]
+    os.replace(staging, final)
+    tmp = os.path.join(root, CURRENT_FILE + f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(final))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(root, CURRENT_FILE))
+    logger.info("📌 Vectorstore version %s is now current", os.path.basename(final))
+    prune(root)
+    return final
+
+
+def discard(staging: str):
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+def prune(root: str, keep: int = VECTORSTORE_KEEP_VERSIONS):
+    """Deletes all but the newest `keep` versions (never the current one)."""
+    versions = os.path.join(root, VERSIONS_DIR)
+    current = current_version(root)
+    # Staging directories left behind by builds that crashed
+    for name in os.listdir(versions):
+        path = os.path.join(versions, name)
+        if name.endswith(STAGING_SUFFIX) and time.time() - os.path.getmtime(path) > STALE_STAGING_AGE:
+            shutil.rmtree(path, ignore_errors=True)
+    published = sorted(
+        (d for d in os.listdir(versions)
+         if not d.endswith(STAGING_SUFFIX) and os.path.isdir(os.path.join(versions, d))),
+        reverse=True,
+    )
+    for name in published[max(keep, 1):]:
+        if name != current:
+            # Readers that still memory-map an old index keep their mapping (POSIX unlink semantics)
+            shutil.rmtree(os.path.join(versions, name), ignore_errors=True)
@@ -0,0 +1,87 @@
+"""
+Shared, location-aware cache for Open-Meteo responses.
+
+Coordinates are snapped to the forecast grid (WEATHER_GRID_RESOLUTION degrees) so
+every user inside the same grid cell shares one upstream request. Entries expire
+on clock-aligned boundaries that follow the model update cadence, and concurrent
+misses for the same cell are coalesced into a single fetch.
+"""
+import time
+import threading
+
+from config.constants import WEATHER_GRID_RESOLUTION
+from utils.logger import get_logger
+
+logger = get_logger("weather_cache")
+
+
+def snap_to_grid(lat: float, lon: float, resolution: float = WEATHER_GRID_RESOLUTION):
+    """Centre of the grid cell containing (lat, lon)."""
+    return (round(round(lat / resolution) * resolution, 6),
+            round(round(lon / resolution) * resolution, 6))
+
+
+def next_refresh(interval: float, now: float = None) -> float:
+    """Next clock-aligned update boundary (e.g. :00, :15, :30, :45 for 900 s)."""
+    now = time.time() if now is None else now
+    return (now // interval + 1) * interval
+
+
+class WeatherCache:
+    """
+    Thread-safe TTL cache with per-key single-flight fetching.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}      # key -> (data, expires_at)
+        self._inflight = {}     # key -> threading.Lock held by the fetching thread
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_fetch(self, kind: str, lat: float, lon: float, interval: float, fetch):
+        """
+        Returns (data, expires_at) for the grid cell containing (lat, lon).
+        `fetch(cell_lat, cell_lon)` is called at most once per cell and refresh window;
+        exceptions propagate and nothing is cached.
+        """
+        cell = snap_to_grid(lat, lon)
+        key = (kind,) + cell
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > time.time():
+                    self.hits += 1
+                    return entry
+                fetch_lock = self._inflight.get(key)
+                if fetch_lock is None:
+                    fetch_lock = self._inflight[key] = threading.Lock()
+                    fetch_lock.acquire()
+                    self.misses += 1
+                    break
+            # Someone else is fetching this cell: wait for it, then re-check the cache
+            with fetch_lock:
+                pass
+
+        try:
+            logger.debug("Weather cache miss for %s cell %s; fetching upstream", kind, cell)
+            data = fetch(*cell)
+            entry = (data, next_refresh(interval))
+            with self._lock:
+                self._entries[key] = entry
+                # Drop expired cells so the cache stays proportional to active locations
+                now = time.time()
+                for k in [k for k, (_, exp) in self._entries.items() if exp <= now]:
+                    del self._entries[k]
+            return entry
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            fetch_lock.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "cells": len(self._entries)}
+
+
+weather_cache = WeatherCache()
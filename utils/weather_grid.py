@@ -0,0 +1,103 @@
+"""
+Gridded live weather from batched multi-location Open-Meteo requests.
+
+Open-Meteo accepts comma-separated coordinate lists and answers with one result
+per location, so a bounding box of grid points is fetched with a handful of
+requests (WEATHER_GRID_BATCH locations each) instead of one call per point.
+The values are returned as a NumPy array (rows south -> north, columns west ->
+east) that the map renderer turns into a temperature or precipitation field.
+Grids are shared through the weather cache, keyed by the snapped centre.
+"""
+import numpy as np
+
+from config.config import OPEN_METEO_BASE
+from config.constants import (
+    WEATHER_GRID_RESOLUTION, WEATHER_GRID_EXTENT, WEATHER_GRID_BATCH,
+    WEATHER_GRID_VARIABLES, WEATHER_CURRENT_REFRESH,
+)
+from utils import http_client
+from utils.weather_cache import weather_cache
+from utils.tracing import span
+from utils.logger import get_logger
+
+logger = get_logger("weather_grid")
+
+
+def grid_axes(south: float, west: float, north: float, east: float,
+              resolution: float = WEATHER_GRID_RESOLUTION):
+    """Latitudes and longitudes of the grid points covering the box, on the forecast grid."""
+    def axis(lo, hi):
+        first, last = round(lo / resolution), round(hi / resolution)
+        return np.round(np.arange(first, last + 1) * resolution, 6)
+    return axis(south, north), axis(west, east)
+
+
+def _fetch_batch(lats, lons, variable: str) -> list:
+    params = {
+        "latitude": ",".join(f"{x:g}" for x in lats),
+        "longitude": ",".join(f"{x:g}" for x in lons),
+        "current": variable,
+    }
+    response = http_client.get(OPEN_METEO_BASE, params=params)
+    response.raise_for_status()
+    data = response.json()
+    # A single location comes back as an object, several as a list in request order
+    return data if isinstance(data, list) else [data]
+
+
+def fetch_weather_grid(south: float, west: float, north: float, east: float,
+                       variable: str = "temperature_2m",
+                       resolution: float = WEATHER_GRID_RESOLUTION) -> dict:
+    """
+    Fetches the current value of `variable` at every grid point in the box.
+    Returns {"variable", "units", "lats", "lons", "values", "time", "requests"};
+    `values` has shape (len(lats), len(lons)) and NaN where a point had no value.
+    """
+    if variable not in WEATHER_GRID_VARIABLES:
+        raise ValueError(f"Unsupported grid variable: {variable}")
+    lats, lons = grid_axes(south, west, north, east, resolution)
+    grid_lat, grid_lon = np.meshgrid(lats, lons, indexing="ij")
+    flat_lat, flat_lon = grid_lat.ravel(), grid_lon.ravel()
+    values = np.full(flat_lat.size, np.nan, dtype=np.float32)
+
+    times, requests = set(), 0
+    with span("weather.grid_fetch", points=int(flat_lat.size), variable=variable) as s:
+        for start in range(0, flat_lat.size, WEATHER_GRID_BATCH):
+            stop = min(start + WEATHER_GRID_BATCH, flat_lat.size)
+            results = _fetch_batch(flat_lat[start:stop], flat_lon[start:stop], variable)
+            requests += 1
+            if len(results) != stop - start:
+                logger.warning("⚠️ Expected %d grid results, got %d", stop - start, len(results))
+            for offset, result in enumerate(results[:stop - start]):
+                current = result.get("current", {})
+                value = current.get(variable)
+                if value is not None:
+                    values[start + offset] = value
+                if current.get("time"):
+                    times.add(current["time"])
+        s.set(requests=requests)
+
+    return {
+        "variable": variable,
+        "units": WEATHER_GRID_VARIABLES[variable],
+        "lats": lats,
+        "lons": lons,
+        "values": values.reshape(grid_lat.shape),
+        "time": max(times) if times else None,
+        "requests": requests,
+    }
+
+
+def get_weather_grid(lat: float, lon: float, variable: str = "temperature_2m",
+                     extent: float = WEATHER_GRID_EXTENT) -> dict:
+    """
+    Current `variable` on the grid within `extent` degrees of (lat, lon), shared through
+    the weather cache and refreshed with the "current" values.
+    """
+    def fetch(cell_lat, cell_lon):
+        return fetch_weather_grid(cell_lat - extent, cell_lon - extent,
+                                  cell_lat + extent, cell_lon + extent, variable)
+
+    data, _ = weather_cache.get_or_fetch(f"grid:{variable}:{extent:g}", lat, lon,
+                                         WEATHER_CURRENT_REFRESH, fetch)
+    return data
@@ -1,5 +1,5 @@
-import requests
 import os
+from utils import http_client
 
 def perform_web_search(query):
     """
@@ -11,7 +11,7 @@ def perform_web_search(query):
 
     headers = {"X-API-KEY": api_key, "Content-Type": "application/json"}
     payload = {"q": query, "num": 5}
-    response = requests.post("https://google.serper.dev/search", headers=headers, json=payload)
+    response = http_client.post("https://google.serper.dev/search", headers=headers, json=payload)
     
     if response.status_code == 200:
         data = response.json()